@@ -0,0 +1,94 @@
+"""
+Load test of the stats.nba.com fetch engine against the local replay server
+
+Serves a cassette (a synthetic one by default) with injected latency, errors and 429s,
+and runs RateLimitedFetcher over it at several worker counts, reporting throughput,
+attempts per request and final statuses. Failures are seeded per request, so two runs
+with the same arguments see the same faults.
+
+    python benchmarks/fetch_load.py --requests 300 --workers 1 4 8 --latency-ms 80 --error-rate 0.1
+    python benchmarks/fetch_load.py --cassette ../data/replay/cassette.db --throttle-rate 0.05
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pipeline.utils.fetcher import RateLimitedFetcher
+from pipeline.utils.replay import Cassette, FaultProfile, configure_replay, request_key, start_replay_server
+
+STATS_URL = 'https://stats.nba.com/stats/leaguedashteamstats?DateFrom=&DateTo={date}&Season=2023-24'
+
+
+def synthetic_cassette(path, n_requests):
+    """Cassette of n_requests team-stats responses of realistic size; returns their URLs"""
+    cassette = Cassette(path)
+    headers = ['TEAM_ID', 'TEAM_NAME'] + [f'STAT_{i}' for i in range(52)]
+    urls = []
+    for i in range(n_requests):
+        url = STATS_URL.format(date=f'day-{i}')
+        rows = [[1610612737 + team, f'Team {team}'] + [round((i + team * j) % 97 * 1.1, 1) for j in range(52)]
+                for team in range(30)]
+        cassette.put(request_key(url), json.dumps({'resultSets': [{'headers': headers, 'rowSet': rows}]}).encode())
+        urls.append(url)
+    return cassette, urls
+
+
+def recorded_urls(cassette, n_requests):
+    keys = [row[0] for row in cassette.conn.execute(
+        "SELECT key FROM responses WHERE key NOT LIKE 'scoreboard:%' LIMIT ?", (n_requests,))]
+    return [f'https://{key}' for key in keys]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch engine load test against the replay server')
+    parser.add_argument('--cassette', help='Recorded cassette to replay (default: a synthetic one)')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--rate', type=float, default=1000.0, help='Client-side requests per second')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.05)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--throttle-rate', type=float, default=0.02)
+    parser.add_argument('--max-rps', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.cassette:
+        cassette = Cassette(args.cassette)
+        urls = recorded_urls(cassette, args.requests)
+    else:
+        cassette, urls = synthetic_cassette(os.path.join(tempfile.mkdtemp(prefix='nba-replay-'), 'cassette.db'),
+                                            args.requests)
+
+    print(f"{len(urls)} requests, latency {args.latency_ms}+/-{args.jitter_ms} ms, "
+          f"{args.error_rate:.0%} errors, {args.throttle_rate:.0%} throttled")
+    for workers in args.workers:
+        # A fresh server per run, so each one sees the same seeded faults
+        faults = FaultProfile(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, max_rps=args.max_rps, retry_after=0, seed=args.seed)
+        server = start_replay_server(cassette, faults)
+        configure_replay(f'http://127.0.0.1:{server.server_address[1]}')
+        fetcher = RateLimitedFetcher(rate=args.rate, burst=workers, max_workers=workers, retries=args.retries,
+                                     backoff=args.backoff, timeout=10)
+        started = time.perf_counter()
+        results = list(fetcher.fetch_many([(i, url, None) for i, url in enumerate(urls)]))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        statuses = Counter(result.status for result in results)
+        attempts = sum(result.attempts for result in results)
+        print(f"  {workers:3d} workers  {elapsed:7.2f}s  {len(results) / elapsed:8.1f} req/s  "
+              f"{attempts / len(results):.2f} attempts/req  {dict(statuses)}")
+    configure_replay()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Prefect overhead of the prediction flow
+
+Renders the same synthetic slate through the Prefect flow (one task run per game and step)
+and as plain function calls (`main.py --no-orchestrator`), and reports the cost per game.
+No network access or trained models are needed.
+
+    python benchmarks/orchestration_overhead.py --games 15 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from prefect import flow
+from pipeline.prediction_pipeline import render_slate
+
+
+def synthetic_slate(n_games, seed=0):
+    rng = np.random.default_rng(seed)
+    games = [(f'Home {i}', f'Away {i}') for i in range(n_games)]
+    p_home = rng.uniform(0.2, 0.8, n_games)
+    p_over = rng.uniform(0.3, 0.7, n_games)
+    ml_predictions = np.column_stack([1 - p_home, p_home])
+    ou_predictions = np.column_stack([1 - p_over, p_over])
+    totals = list(np.round(rng.uniform(210, 240, n_games) * 2) / 2)
+    home_odds = list(rng.choice([-250, -150, -110, 120, 180], n_games))
+    away_odds = list(rng.choice([-200, -130, 105, 140, 210], n_games))
+    return games, ml_predictions, ou_predictions, totals, home_odds, away_odds
+
+
+@flow(log_prints=False)
+def render_flow(slate):
+    render_slate(*slate, use_kelly_criterion=True, orchestrator=True)
+
+
+@flow(log_prints=False)
+def empty_flow():
+    pass
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefect overhead of the prediction flow')
+    parser.add_argument('--games', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    slate = synthetic_slate(args.games)
+    # Warm up Prefect's ephemeral API and the import caches once
+    timed(empty_flow, 1)
+
+    plain = timed(lambda: render_slate(*slate, use_kelly_criterion=True, orchestrator=False), args.repeat)
+    empty = timed(empty_flow, args.repeat)
+    orchestrated = timed(lambda: render_flow(slate), args.repeat)
+
+    print(f"slate of {args.games} games (best of {args.repeat})")
+    print(f"  plain calls     {plain * 1e3:9.2f} ms  {plain / args.games * 1e6:9.1f} us/game")
+    print(f"  empty flow run  {empty * 1e3:9.2f} ms")
+    print(f"  Prefect flow    {orchestrated * 1e3:9.2f} ms  {(orchestrated - empty) / args.games * 1e6:9.1f} us/game "
+          f"(tasks only)")
+
+
+if __name__ == '__main__':
+    main()
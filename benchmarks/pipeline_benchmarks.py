@@ -0,0 +1,395 @@
+"""
+Synthetic-data benchmarks of the collection, training and prediction paths
+
+Generates OddsData.csv rows, daily team snapshots (long `team_stats` layout) and a match
+schedule for N synthetic seasons in a scratch directory, then times each stage on them:
+
+    load_csv         process_csv_file: OddsData.csv into per-season odds tables
+    rest_days        process_odd_data: rest days for every game
+    merge            merge_data: team snapshots joined onto the odds rows (full rebuild)
+    merge_nightly    merge_data after one new game day: only the new games are merged
+    game_log         derive_snapshots: every daily team snapshot of a season from its game log
+    load_dataset     load_dataset: the full merged history from its columnar copy
+    features         materialize_features: Dataset.db into the float32 feature store
+    train            train_model for ML and OU (small hyperparameter search + final refit)
+    schedule_index   build_schedule_index: parse the schedule CSV
+    today_game       create_today_game on a 15-game slate (warm schedule index)
+
+Each stage reports its best wall time over `--repeat` runs, throughput and the peak memory
+traced by tracemalloc in one extra run (driver process only: training workers are not
+traced). Nothing touches the network.
+
+    python benchmarks/pipeline_benchmarks.py --seasons 1 15
+    python benchmarks/pipeline_benchmarks.py --seasons 1 --save-baseline
+    python benchmarks/pipeline_benchmarks.py --seasons 1 --check --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+import pandas as pd
+from pipeline.data_collection_pipeline import process_csv_file, process_odd_data, merge_data
+from pipeline.model_training_pipeline import train_model
+from pipeline.utils.dataset_store import columnar_path, load_dataset
+from pipeline.utils.feature_store import materialize_features, read_manifest
+from pipeline.utils.game_logs import derive_snapshots
+from pipeline.utils.hyperparameter_search import init_worker
+from pipeline.utils.schedule_index import SCHEDULE_PATH, build_schedule_index, load_schedule_index
+from pipeline.utils.franchises import FRANCHISES, franchise_ids, nba_team_ids, team_names
+from pipeline.utils.team_store import TEAM_STATS_TABLE, KEY_COLUMNS, ensure_team_stats_table
+from pipeline.utils.today_game import create_today_game
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+STATS = ['GP', 'W', 'L', 'W_PCT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA',
+         'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS', 'PLUS_MINUS']
+TEAM_COLUMNS = ['TEAM_ID', 'TEAM_NAME'] + STATS + [f'{stat}_RANK' for stat in STATS]
+SEASON_DAYS = 170
+SLATE_GAMES = 15
+
+TRAIN_SETTINGS = {'n-trials': 2, 'n-folds': 3, 'early-stopping-rounds': 20, 'seed': 100}
+
+
+def season_teams(season):
+    """The team names of a season, in the order stats.nba.com lists them"""
+    return team_names(f"{season[:4]}-10-22")
+
+
+def team_ids(teams):
+    return nba_team_ids(franchise_ids(teams))
+
+
+def season_keys(n_seasons, last_start=2024):
+    return [f"{year}-{str(year + 1)[2:]}" for year in range(last_start - n_seasons + 1, last_start + 1)]
+
+
+def american_odds(probability):
+    """Money line for a win probability, with the favourite negative"""
+    probability = np.clip(probability, 0.05, 0.95)
+    return np.where(probability >= 0.5, -100 * probability / (1 - probability),
+                    100 * (1 - probability) / probability).round()
+
+
+def season_games(rng, season):
+    """One synthetic regular season: a random slate of 4 to 11 games on each of SEASON_DAYS days"""
+    start = pd.Timestamp(f"{season[:4]}-10-22")
+    teams = season_teams(season)
+    rows = []
+    for day in range(SEASON_DAYS):
+        order = rng.permutation(len(teams))
+        for g in range(rng.integers(4, 12)):
+            rows.append((start + pd.Timedelta(days=day), teams[order[2 * g]], teams[order[2 * g + 1]]))
+    games = pd.DataFrame(rows, columns=['Date', 'Home', 'Away'])
+
+    p_home = rng.uniform(0.15, 0.85, len(games))
+    margin = rng.normal(3, 12, len(games)).round()
+    margin[margin == 0] = 1
+    games['OU'] = (rng.uniform(190, 240, len(games)) * 2).round() / 2
+    games['Spread'] = (rng.uniform(0, 15, len(games)) * 2).round() / 2
+    games['ML_Home'] = american_odds(p_home + 0.02)
+    games['ML_Away'] = american_odds(1 - p_home + 0.02)
+    games['Points'] = rng.normal(games['OU'], 18).round()
+    games['Win_Margin'] = margin
+    return games
+
+
+def generate(workdir, n_seasons, seed=0):
+    """Write the synthetic OddsData.csv, TeamData.db and schedule; returns the pipeline config"""
+    rng = np.random.default_rng(seed)
+    for path in ('pipeline', 'data/csv', 'data/cache'):
+        os.makedirs(os.path.join(workdir, path), exist_ok=True)
+
+    for name in ('TeamData.db', 'OddData.db', 'Dataset.db'):
+        if os.path.exists(os.path.join(workdir, 'data', name)):
+            os.remove(os.path.join(workdir, 'data', name))
+
+    seasons = season_keys(n_seasons)
+    config = {'team-data': {'storage': 'long'}, 'dataset': {'columnar': True}, 'fetch-data': {}, 'create-game': {}}
+    odds = []
+    schedule = []
+    team_conn = sqlite3.connect(os.path.join(workdir, 'data', 'TeamData.db'))
+    ensure_team_stats_table(team_conn, TEAM_COLUMNS)
+    columns = ', '.join(f'"{col}"' for col in KEY_COLUMNS + TEAM_COLUMNS)
+    placeholders = ', '.join('?' for _ in KEY_COLUMNS + TEAM_COLUMNS)
+    for season in seasons:
+        games = season_games(rng, season)
+        dates = {'start_date': str(games['Date'].min().date()), 'end_date': str(games['Date'].max().date())}
+        config['fetch-data'][season] = config['create-game'][season] = dates
+        odds.append(games)
+
+        # One 30-team snapshot per game day, rows in the season's API order
+        teams = season_teams(season)
+        ids = team_ids(teams)
+        # The schedule uses today's franchise names, as the prediction path looks them up
+        schedule.append(pd.DataFrame({
+            'Date': games['Date'].dt.strftime('%d/%m/%Y 00:30'),
+            'Home Team': [FRANCHISES[franchise][0] for franchise in franchise_ids(games['Home'])],
+            'Away Team': [FRANCHISES[franchise][0] for franchise in franchise_ids(games['Away'])],
+        }))
+        days = games['Date'].dt.strftime('%Y-%m-%d').unique()
+        stats = rng.random((len(days) * len(teams), len(TEAM_COLUMNS) - 2)) * 100
+        team_conn.executemany(f'INSERT INTO "{TEAM_STATS_TABLE}" ({columns}) VALUES ({placeholders})', [
+            (day, season, position, int(ids[position]), team, *stats[d * len(teams) + position])
+            for d, day in enumerate(days) for position, team in enumerate(teams)
+        ])
+    team_conn.commit()
+    team_conn.close()
+
+    odds = pd.concat(odds, ignore_index=True)
+    odds['Date'] = odds['Date'].dt.strftime('%Y-%m-%d')
+    odds.to_csv(os.path.join(workdir, 'data', 'OddsData.csv'), index_label='index')
+
+    # Schedule in the fixture-download format of nba-2024-UTC.csv
+    schedule = pd.concat(schedule, ignore_index=True)
+    schedule.insert(0, 'Match Number', np.arange(1, len(schedule) + 1))
+    schedule.insert(1, 'Round Number', 1)
+    schedule.insert(3, 'Location', 'Arena')
+    schedule['Result'] = ''
+    schedule.to_csv(os.path.join(workdir, 'pipeline', SCHEDULE_PATH), index=False)
+    return config
+
+
+def season_game_log(season, seed=0):
+    """A leaguegamelog frame (two rows per game) for the games of the synthetic season in OddsData.csv"""
+    rng = np.random.default_rng(seed)
+    games = pd.read_csv('../data/OddsData.csv', usecols=['Date', 'Home', 'Away', 'Win_Margin'])
+    games = games[games['Date'].between(f"{season[:4]}-08-01", f"{int(season[:4]) + 1}-07-31")]
+    box = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+    sides = []
+    for team_col, won in (('Home', games['Win_Margin'] > 0), ('Away', games['Win_Margin'] < 0)):
+        side = pd.DataFrame(rng.integers(0, 50, (len(games), len(box))), columns=box)
+        side.insert(0, 'TEAM_ID', team_ids(games[team_col]))
+        side.insert(1, 'TEAM_NAME', games[team_col].to_numpy())
+        side.insert(2, 'GAME_ID', np.arange(len(games)))
+        side.insert(3, 'GAME_DATE', games['Date'].to_numpy())
+        side.insert(4, 'WL', np.where(won, 'W', 'L'))
+        side.insert(5, 'MIN', 240)
+        side['PLUS_MINUS'] = rng.integers(-20, 21, len(games))
+        sides.append(side)
+    return pd.concat(sides, ignore_index=True)
+
+
+def today_inputs(seed=0):
+    """Today's team stats frame and a SLATE_GAMES slate with odds, as the prediction path gets them"""
+    rng = np.random.default_rng(seed)
+    teams = team_names()
+    stats = pd.DataFrame(rng.random((len(teams), len(TEAM_COLUMNS) - 2)) * 100, columns=TEAM_COLUMNS[2:])
+    stats.insert(0, 'TEAM_NAME', teams)
+    stats.insert(0, 'TEAM_ID', team_ids(teams))
+    games = [(teams[i], teams[i + SLATE_GAMES]) for i in range(SLATE_GAMES)]
+    odds = {f'{home}:{away}': {'under_over_odds': 220.5, home: {'money_line_odds': -150},
+                               away: {'money_line_odds': 130}} for home, away in games}
+    return games, stats, odds
+
+
+def stages(config):
+    """(name, unit, setup, run) for every stage; run returns the number of units processed"""
+    odd_db, team_db, dataset_db = '../data/OddData.db', '../data/TeamData.db', '../data/Dataset.db'
+    store_dir = '../data/features'
+
+    def count_odds():
+        return len(pd.read_csv('../data/OddsData.csv', usecols=['Date']))
+
+    def reset_features():
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    def reset_dataset():
+        if os.path.exists(dataset_db):
+            os.remove(dataset_db)
+        shutil.rmtree(columnar_path(dataset_db), ignore_errors=True)
+
+    last_season = list(config['create-game'])[-1]
+    nightly = {}
+
+    def before_last_day():
+        # Merge the history without the last game day, so the timed run only sees that day
+        conn = sqlite3.connect(odd_db)
+        odds = pd.read_sql_query(f'SELECT * FROM "odds_{last_season}"', conn, index_col='index')
+        last_day = odds['Date'].astype(str) == odds['Date'].astype(str).max()
+        odds[~last_day].to_sql(f'odds_{last_season}', conn, if_exists='replace', index_label='index')
+        conn.commit()
+        merge_data.fn(config, team_db, odd_db, dataset_db)
+        odds.to_sql(f'odds_{last_season}', conn, if_exists='replace', index_label='index')
+        conn.commit()
+        conn.close()
+        nightly['games'] = int(last_day.sum())
+
+    def train():
+        settings = dict(TRAIN_SETTINGS, **{'trials-db': '../data/trials.db'})
+        if os.path.exists(settings['trials-db']):
+            os.remove(settings['trials-db'])
+        fits = 0
+        dataset_hash = read_manifest(store_dir)['dataset_hash']
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=init_worker,
+                                 initargs=(store_dir,)) as executor:
+            for target in ('ML', 'OU'):
+                train_model(store_dir, target, dataset_hash, settings, executor)
+                fits += settings['n-trials'] * settings['n-folds'] + 1
+        return fits
+
+    games, stats, odds = today_inputs()
+    game_log = {}
+
+    def load_game_log():
+        game_log['log'] = season_game_log(last_season)
+        game_log['dates'] = pd.date_range(config['fetch-data'][last_season]['start_date'],
+                                          config['fetch-data'][last_season]['end_date']).strftime('%Y-%m-%d')
+
+    def today_game():
+        for _ in range(20):
+            create_today_game(games, stats, odds)
+        return 20 * len(games)
+
+    return [
+        ('load_csv', 'rows', None, lambda: (process_csv_file.fn(config, odd_db), count_odds())[1]),
+        ('rest_days', 'rows', None, lambda: (process_odd_data.fn(odd_db), count_odds())[1]),
+        ('merge', 'rows', reset_dataset,
+         lambda: (merge_data.fn(config, team_db, odd_db, dataset_db), dataset_rows())[1]),
+        ('merge_nightly', 'games', before_last_day,
+         lambda: (merge_data.fn(config, team_db, odd_db, dataset_db), nightly['games'])[1]),
+        ('game_log', 'snapshots', load_game_log, lambda: len(derive_snapshots(game_log['log'], game_log['dates']))),
+        ('load_dataset', 'rows', None, lambda: len(load_dataset(dataset_db))),
+        ('features', 'rows', reset_features, lambda: materialize_features(dataset_db, store_dir)['rows']),
+        ('train', 'fits', None, train),
+        ('schedule_index', 'games', None, lambda: sum(map(len, build_schedule_index(SCHEDULE_PATH).values())) // 2),
+        ('today_game', 'games', lambda: load_schedule_index(SCHEDULE_PATH), today_game),
+    ]
+
+
+def dataset_rows():
+    conn = sqlite3.connect('../data/Dataset.db')
+    rows = conn.execute('SELECT COUNT(*) FROM dataset').fetchone()[0]
+    conn.close()
+    return rows
+
+
+def quiet(function):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return function()
+
+
+def measure(setup, run, repeat, memory=True):
+    """Best wall time over `repeat` runs, units processed and traced peak memory in MB"""
+    timings = []
+    units = 0
+    for _ in range(repeat):
+        if setup:
+            quiet(setup)
+        started = time.perf_counter()
+        units = quiet(run)
+        timings.append(time.perf_counter() - started)
+
+    peak_mb = None
+    if memory:
+        if setup:
+            quiet(setup)
+        tracemalloc.start()
+        try:
+            quiet(run)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return min(timings), units, peak_mb
+
+
+def compare(results, baselines, threshold, min_seconds=0.05):
+    """Failures where a stage is slower, or needs more memory, than its baseline by more than `threshold`
+
+    Slowdowns under `min_seconds` are ignored: millisecond stages are dominated by timer noise.
+    """
+    failures = []
+    for scale, scale_results in results.items():
+        for stage, result in scale_results.items():
+            baseline = baselines.get(scale, {}).get(stage)
+            if baseline is None:
+                continue
+            for key, label in (('seconds', 'time'), ('peak_mb', 'peak memory')):
+                if result.get(key) is None or baseline.get(key) is None:
+                    continue
+                if key == 'seconds' and result[key] - baseline[key] < min_seconds:
+                    continue
+                if result[key] > baseline[key] * (1 + threshold):
+                    failures.append(f"{scale} seasons / {stage}: {label} {result[key]:.3f} vs baseline "
+                                    f"{baseline[key]:.3f} (+{(result[key] / baseline[key] - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic-data pipeline benchmarks')
+    parser.add_argument('--seasons', type=int, nargs='+', default=[1], help='Scales to run (e.g. 1 15 50)')
+    parser.add_argument('--stages', nargs='+', help='Only run these stages')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced peak-memory run')
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baselines')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero when a stage regresses')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown over the baseline')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='Ignore slowdowns smaller than this')
+    parser.add_argument('--output', help='Also write the results as JSON to this path')
+    parser.add_argument('--workdir', help='Generate data here and keep it (default: a temporary directory)')
+    args = parser.parse_args()
+
+    results = {}
+    cwd = os.getcwd()
+    for n_seasons in args.seasons:
+        workdir = args.workdir or tempfile.mkdtemp(prefix='nba-bench-')
+        try:
+            started = time.perf_counter()
+            config = generate(workdir, n_seasons)
+            print(f"{n_seasons} seasons: data generated in {time.perf_counter() - started:.1f}s ({workdir})")
+
+            # Stages use the pipeline's relative ../data paths
+            os.chdir(os.path.join(workdir, 'pipeline'))
+            scale_results = results[str(n_seasons)] = {}
+            for name, unit, setup, run in stages(config):
+                if args.stages and name not in args.stages:
+                    continue
+                seconds, units, peak_mb = measure(setup, run, args.repeat, memory=not args.no_memory)
+                scale_results[name] = {'seconds': seconds, unit: units, f'{unit}_per_second': units / seconds,
+                                       'peak_mb': peak_mb}
+                memory = f"{peak_mb:9.1f} MB" if peak_mb is not None else ''
+                print(f"  {name:15s} {seconds:9.3f}s  {units / seconds:12.1f} {unit}/s  {memory}")
+        finally:
+            os.chdir(cwd)
+            if not args.workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines.update({scale: {stage: {'seconds': round(result['seconds'], 4),
+                                          'peak_mb': None if result['peak_mb'] is None else round(result['peak_mb'], 1)}
+                                  for stage, result in scale_results.items()}
+                          for scale, scale_results in results.items()})
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baselines saved to {args.baselines}")
+        return
+
+    failures = compare(results, baselines, args.threshold, args.min_seconds)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
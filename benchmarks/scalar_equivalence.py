@@ -0,0 +1,87 @@
+"""
+Equivalence check of the scalar EV and Kelly wrappers against the original scalar code
+
+expected_value, american_to_decimal and calculate_kelly_criterion are thin wrappers over
+the array functions, but must return exactly what the original implementations (copied
+below) returned, including Python's round() for plain floats and NumPy's for NumPy
+scalars. Every (probability, odds) pair of a grid is compared in both input types.
+
+    python benchmarks/scalar_equivalence.py
+    python benchmarks/scalar_equivalence.py --odds-step 1 --probability-step 0.0005
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pipeline.utils.expected_value import expected_value, cashout
+from pipeline.utils.kelly_criterion import american_to_decimal, calculate_kelly_criterion
+
+
+def original_cashout(odds):
+    if odds > 0:
+        return odds
+    else:
+        return (100 / (-1 * odds)) * 100
+
+
+def original_expected_value(winPercenetage, odds):
+    lossPercentage = 1 - winPercenetage
+    winMoney = original_cashout(odds)
+    return round((winPercenetage * winMoney) - (lossPercentage * 100), 2)
+
+
+def original_american_to_decimal(american_odds):
+    if american_odds >= 100:
+        decimal_odds = (american_odds / 100)
+    else:
+        decimal_odds = (100 / abs(american_odds))
+    return round(decimal_odds, 2)
+
+
+def original_calculate_kelly_criterion(american_odds, model_prob):
+    decimal_odds = original_american_to_decimal(american_odds)
+    bankroll_fraction = round((100 * (decimal_odds * model_prob - (1 - model_prob))) / decimal_odds, 2)
+    return bankroll_fraction if bankroll_fraction > 0 else 0
+
+
+CHECKS = [
+    ('cashout', lambda p, odds: cashout(odds), lambda p, odds: original_cashout(odds)),
+    ('american_to_decimal', lambda p, odds: american_to_decimal(odds),
+     lambda p, odds: original_american_to_decimal(odds)),
+    ('expected_value', expected_value, original_expected_value),
+    ('calculate_kelly_criterion', lambda p, odds: calculate_kelly_criterion(odds, p),
+     lambda p, odds: original_calculate_kelly_criterion(odds, p)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scalar EV/Kelly wrappers vs the original scalar code')
+    parser.add_argument('--odds-step', type=int, default=10)
+    parser.add_argument('--max-odds', type=int, default=1000)
+    parser.add_argument('--probability-step', type=float, default=0.001)
+    args = parser.parse_args()
+
+    odds_grid = [int(odds) for odds in np.arange(-args.max_odds, -99, args.odds_step)] + \
+                [int(odds) for odds in np.arange(100, args.max_odds + 1, args.odds_step)]
+    probabilities = [round(float(p), 6) for p in np.arange(args.probability_step, 1, args.probability_step)]
+    inputs = {
+        'float/int': [(p, odds) for p in probabilities for odds in odds_grid],
+        'numpy': [(np.float64(p), np.int64(odds)) for p in probabilities for odds in odds_grid],
+    }
+
+    failures = 0
+    for kind, pairs in inputs.items():
+        for name, wrapper, original in CHECKS:
+            mismatches = [(p, odds) for p, odds in pairs if wrapper(p, odds) != original(p, odds)]
+            failures += len(mismatches)
+            print(f"{name:26s} {kind:9s} {len(pairs)} pairs, {len(mismatches)} mismatches"
+                  + (f" (first: p={mismatches[0][0]}, odds={mismatches[0][1]})" if mismatches else ''))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
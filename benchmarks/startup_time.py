@@ -0,0 +1,100 @@
+"""
+CLI startup benchmark
+
+Runs each scenario in a fresh interpreter with `-X importtime`, reports wall time and the
+slowest packages, and checks that the predict path never loads training-only modules.
+
+    python benchmarks/startup_time.py            # report
+    python benchmarks/startup_time.py --check    # also fail when a budget is exceeded
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pipeline')
+
+SCENARIOS = {
+    'help': "import sys; sys.argv = ['main.py', '--help']; import main\n"
+            "try:\n    main.main()\nexcept SystemExit:\n    pass",
+    'predict': "import main\n"
+               "from pipeline.prediction_pipeline import prediction_pipeline\n"
+               "from pipeline.utils.today_odds import get_sbr_odds\n"
+               "from pipeline.utils.tools import fetch_today_games_json",
+    'serve': "import main\nfrom pipeline.prediction_server import serve",
+    'collect': "import main\nfrom pipeline.data_collection_pipeline import main",
+    'train': "import main\nfrom pipeline.model_training_pipeline import main",
+}
+
+# Modules the predict path must not import (scikit-learn itself is loaded by LightGBM)
+TRAINING_ONLY = [
+    'pipeline.data_collection_pipeline', 'pipeline.model_training_pipeline', 'pipeline.backtest_pipeline',
+    'pipeline.utils.hyperparameter_search', 'pipeline.utils.feature_store', 'pipeline.utils.fetcher', 'tqdm',
+]
+
+# --help only builds the argument parser, so it must not load anything the stages need
+HELP_FORBIDDEN = ['numpy', 'pandas', 'toml', 'colorama', 'pipeline.utils.response_cache', 'pipeline.utils.metrics']
+
+BUDGETS = {'help': 1.0}
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_scenario(code):
+    """Return (wall seconds, [(cumulative us, module, depth)]) for code run in a fresh interpreter"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PIPELINE_DIR,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports.append((int(match.group(2)), match.group(4), len(match.group(3)) // 2))
+    return wall, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI startup benchmark')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--top', type=int, default=8, help='Slowest packages to show')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero when a budget is exceeded')
+    args = parser.parse_args()
+
+    failures = []
+    for name in args.scenarios:
+        wall, imports = run_scenario(SCENARIOS[name])
+        total = sum(cumulative for cumulative, _, depth in imports if depth == 0)
+        print(f"{name:8s} {wall:6.2f}s wall, {len(imports)} modules, {total / 1e6:.2f}s importing")
+        # Cost of each package: its most expensive import, i.e. the one that loaded it first
+        packages = {}
+        for cumulative, module, _ in imports:
+            package = module.split('.')[0]
+            packages[package] = max(packages.get(package, 0), cumulative)
+        for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {cumulative / 1e3:8.1f} ms  {package}")
+
+        if name in BUDGETS and wall > BUDGETS[name]:
+            failures.append(f"{name} took {wall:.2f}s (budget {BUDGETS[name]:.2f}s)")
+        if name in ('help', 'predict'):
+            loaded = {module for _, module, _ in imports}
+            leaked = [module for module in TRAINING_ONLY if module in loaded]
+            if leaked:
+                failures.append(f"{name} imports training-only modules: {', '.join(leaked)}")
+        if name == 'help':
+            heavy = [module for module in HELP_FORBIDDEN if module in {module for _, module, _ in imports}]
+            if heavy:
+                failures.append(f"help imports {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
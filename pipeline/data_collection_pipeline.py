@@ -2,23 +2,36 @@
 Data Collection Pipeline for NBA Statistics
 """
 import os
-import re
-import random
-import time
 import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 from datetime import datetime, timedelta
 import pandas as pd
 import toml
-from sbrscrape import Scoreboard
 from prefect import flow, task
 from prefect.task_runners import ThreadPoolTaskRunner
 from tqdm import tqdm
-from pipeline.utils.tools import fetch_json_data, convert_json_to_df
-from pipeline.utils.team_code_index import (
-    team_index_10, team_index_12, team_index_13,
-    team_index_14, team_index_current
+from pipeline.utils.tools import convert_json_to_df, fetch_scoreboard_games
+from pipeline.utils import metrics
+from pipeline.utils.response_cache import configure_cache, get_cache, CacheMiss
+from pipeline.utils.fetcher import (
+    fetcher_from_config, TokenBucket, FETCH_OK, FETCH_EMPTY, FETCH_TIMEOUT, FETCH_ERROR
+)
+from pipeline.utils.game_logs import derive_snapshots, game_log_url, reconcile_snapshot, sample_dates
+from pipeline.utils.dataset_store import (
+    DATASET_TABLE, PARTITIONS_TABLE, columnar_path, is_current, write_dataset, season_fingerprint,
+    read_partitions, dataset_columns, write_partition, drop_partition, read_table
+)
+from pipeline.utils.team_store import (
+    team_storage_mode, write_team_snapshot, read_team_snapshots,
+    list_per_date_tables, migrate_per_date_tables, stored_snapshot_dates,
+    snapshot_digests, update_snapshot_digest
 )
+from pipeline.utils.watermarks import (
+    final_dates, mark_collected, seed_watermarks, clear_watermarks
+)
+from pipeline.utils.franchises import franchise_ids, N_FRANCHISES, UNKNOWN
 @task(log_prints=True)
 def process_csv_file(config, odd_db_path):
     """Process CSV odds data file into season tables"""
@@ -30,23 +43,46 @@ def process_csv_file(config, odd_db_path):
     data = pd.read_csv(csv_path)
     data['Date'] = pd.to_datetime(data['Date'], yearfirst=True).dt.date
 
+    mutable_days = collection_settings(config)[0]
+
     for season_key, season_data in config['fetch-data'].items():
         start = datetime.strptime(season_data["start_date"], "%Y-%m-%d").date()
         end = datetime.strptime(season_data["end_date"], "%Y-%m-%d").date()
         season_df = data[(data['Date'] >= start) & (data['Date'] <= end)]
+
+        # Never wipe a season the CSV does not cover, it may hold incrementally fetched odds
+        if season_df.empty:
+            print(f"No CSV odds for {season_key}, keeping stored odds")
+            continue
+
         season_df.to_csv(f"{output_folder}odds_{season_key}.csv", index=False)
         season_df.to_sql(f"odds_{season_key}", conn, if_exists="replace", index=False)
+        seed_watermarks(conn, 'odds', sorted(set(season_df['Date'])), mutable_days)
 
     conn.close()
     print("CSV processing completed.")
 
 
-@task(log_prints=True)
-def fetch_team_data(config, team_db_path):
-    """Fetch team statistics data for each day in the season"""
+def collection_settings(config):
+    """Return (mutable_days, full_refresh) from the [collection] config section"""
+    settings = config.get('collection', {})
+    return settings.get('mutable-days', 1), settings.get('full-refresh', False)
+
+
+def pending_watermarks(conn, source, stored_dates, config):
+    """Sync the completion log with stored data and return the dates already final"""
+    mutable_days, full_refresh = collection_settings(config)
+    if full_refresh:
+        clear_watermarks(conn, source)
+    else:
+        seed_watermarks(conn, source, sorted(stored_dates), mutable_days)
+    return final_dates(conn, source)
+
+
+def team_data_requests(config):
+    """List ((date, season), url, date) requests for every configured season day"""
     url = config['data-url']['data-url']
-    conn = sqlite3.connect(team_db_path)
-    cursor = conn.cursor()
+    requests_to_make = []
 
     for season_key, season_value in config['fetch-data'].items():
         start_date = datetime.strptime(season_value['start_date'], "%Y-%m-%d").date()
@@ -61,223 +97,496 @@ def fetch_team_data(config, team_db_path):
                 current_date.year,
                 season_key
             )
-            print(f"Fetching tean data {current_date}")
-
-            raw_data = fetch_json_data(url_data)
-            if raw_data:
-                data = convert_json_to_df(raw_data)
-                columns = ', '.join([f'"{col}" TEXT' for col in data.columns])
-                create_table_query = (f"CREATE TABLE IF NOT EXISTS '{current_date.strftime('%Y-%m-%d')}'"
-                                      f" ({columns}, 'Date' TEXT);")
-                cursor.execute(create_table_query)
+            requests_to_make.append(((current_date, season_key), url_data, current_date))
+            current_date += timedelta(days=1)
+
+    return requests_to_make
+
+
+def store_team_data(conn, storage, data, current_date, season_key):
+    """Write one day's team snapshot in the configured TeamData.db layout"""
+    if storage == 'long':
+        write_team_snapshot(conn, data, current_date, season_key)
+        return
+
+    columns = ', '.join([f'"{col}" TEXT' for col in data.columns])
+    create_table_query = (f"CREATE TABLE IF NOT EXISTS '{current_date.strftime('%Y-%m-%d')}'"
+                          f" ({columns}, 'Date' TEXT);")
+    conn.execute(create_table_query)
+    conn.commit()
+    data['Date'] = str(current_date)
+    data.to_sql(current_date.strftime('%Y-%m-%d'), conn, if_exists='replace', index=True)
+    update_snapshot_digest(conn, storage, current_date.strftime('%Y-%m-%d'))
+
+
+@task(log_prints=True)
+def fetch_team_data(config, team_db_path):
+    """Fetch team statistics data for each day in the season"""
+    storage = team_storage_mode(config)
+    mutable_days = collection_settings(config)[0]
+    conn = sqlite3.connect(team_db_path)
+
+    # Only dates that are missing or were still mutable when last collected are fetched
+    done = pending_watermarks(conn, 'team', stored_snapshot_dates(conn), config)
+    requests_to_make = [request for request in team_data_requests(config) if str(request[2]) not in done]
+    print(f"{len(requests_to_make)} team snapshot dates to fetch")
+    summary = {FETCH_OK: 0, FETCH_EMPTY: 0, FETCH_TIMEOUT: 0, FETCH_ERROR: 0}
+
+    # Requests run concurrently under the shared rate limit; SQLite writes stay on this thread
+    with fetcher_from_config(config) as fetcher:
+        for result in fetcher.fetch_many(requests_to_make):
+            current_date, season_key = result.key
+            summary[result.status] += 1
+
+            if result.status == FETCH_OK:
+                print(f"Fetched team data {current_date}")
+                store_team_data(conn, storage, convert_json_to_df(result.data), current_date, season_key)
+                mark_collected(conn, 'team', current_date, mutable_days)
                 conn.commit()
-                data['Date'] = str(current_date)
-                data.to_sql(current_date.strftime('%Y-%m-%d'), conn, if_exists='replace', index=True)
-            else:
+            elif result.status == FETCH_EMPTY:
+                # Not marked collected: an empty response may be a transient failure
                 print(f"No data for {current_date}")
+            elif result.status == FETCH_TIMEOUT:
+                print(f"Timed out fetching team data {current_date} after {result.attempts} attempts")
+            else:
+                print(f"Failed fetching team data {current_date}: {result.error}")
 
-            current_date += timedelta(days=1)
-            time.sleep(random.uniform(0.5, 2))
+    conn.close()
+    print(f"Team data fetching completed: {summary[FETCH_OK]} fetched, {summary[FETCH_EMPTY]} empty, "
+          f"{summary[FETCH_TIMEOUT]} timed out, {summary[FETCH_ERROR]} failed.")
+
+
+def team_data_source(config):
+    """Return where daily team snapshots come from: 'snapshots' (one API request per date) or 'game-log'"""
+    return config.get('team-data', {}).get('source', 'snapshots')
+
+
+@task(log_prints=True)
+def fetch_team_game_logs(config, team_db_path):
+    """Derive every pending day's team snapshot from one game log request per season"""
+    storage = team_storage_mode(config)
+    mutable_days = collection_settings(config)[0]
+    settings = config.get('team-data', {})
+    conn = sqlite3.connect(team_db_path)
 
+    done = pending_watermarks(conn, 'team', stored_snapshot_dates(conn), config)
+    pending = {}
+    api_requests = {}
+    for request in team_data_requests(config):
+        current_date, season_key = request[0]
+        api_requests[str(current_date)] = request
+        if str(current_date) not in done:
+            pending.setdefault(season_key, []).append(current_date)
+    print(f"{sum(map(len, pending.values()))} team snapshot dates to derive from {len(pending)} season game logs")
+
+    # A finished season's log never changes, so it is cached like a completed date
+    requests_to_make = [(season_key, game_log_url(config, season_key), config['fetch-data'][season_key]['end_date'])
+                        for season_key in pending]
+    derived = {}
+    with fetcher_from_config(config) as fetcher:
+        for result in fetcher.fetch_many(requests_to_make):
+            season_key = result.key
+            if result.status != FETCH_OK:
+                print(f"Failed fetching the {season_key} game log: {result.error or result.status}")
+                continue
+
+            snapshots = derive_snapshots(convert_json_to_df(result.data), pending[season_key])
+            for current_date in pending[season_key]:
+                snapshot = snapshots.get(str(current_date))
+                if snapshot is not None:
+                    store_team_data(conn, storage, snapshot.copy(), current_date, season_key)
+                mark_collected(conn, 'team', current_date, mutable_days)
+            conn.commit()
+            derived.update(snapshots)
+            print(f"Derived {len(snapshots)} team snapshots for {season_key}")
+
+        # Check a sample of the derived snapshots against the per-date API responses
+        sample = sample_dates(derived, settings.get('reconcile-sample', 5), settings.get('reconcile-seed', 0))
+        failed = 0
+        for result in fetcher.fetch_many([api_requests[date] for date in sample]):
+            current_date, season_key = result.key
+            if result.status != FETCH_OK:
+                print(f"Could not reconcile {current_date}: {result.error or result.status}")
+                continue
+            report = reconcile_snapshot(derived[str(current_date)], convert_json_to_df(result.data))
+            if not report['ok']:
+                failed += 1
+                differences = {key: value for key, value in report.items() if value and key != 'ok'}
+                print(f"Derived snapshot {current_date} differs from the API: {differences}")
+        metrics.set_gauge('team_snapshot_reconcile_failures', failed)
+        if sample:
+            print(f"Reconciled {len(sample)} derived snapshots against the API: {failed} differ")
+
+    conn.close()
+
+
+@task(log_prints=True)
+def migrate_team_data(config, team_db_path):
+    """Move legacy per-date team tables into the long team_stats table"""
+    conn = sqlite3.connect(team_db_path)
+    if list_per_date_tables(conn):
+        drop_tables = config.get('team-data', {}).get('drop-legacy-tables', False)
+        migrated = migrate_per_date_tables(conn, config, drop_tables=drop_tables)
+        print(f"Migrated {migrated} per-date team tables into team_stats")
     conn.close()
-    print("Team data fetching completed.")
+
+
+def write_odds_day(conn, table, day, rows):
+    """Replace the stored odds rows for one day, appending after the table's last index"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    start_index = 0
+    if exists:
+        conn.execute(f'DELETE FROM "{table}" WHERE "Date" = ?', (str(day),))
+        last_index = conn.execute(f'SELECT MAX("index") FROM "{table}"').fetchone()[0]
+        start_index = 0 if last_index is None else int(last_index) + 1
+    if rows:
+        df = pd.DataFrame(rows, index=pd.RangeIndex(start_index, start_index + len(rows)))
+        df.to_sql(table, conn, if_exists="append", index=True, index_label='index')
+
+
+def odds_rows(games, day, sportsbook):
+    """Turn one day's Scoreboard games into odds rows, counting games without the sportsbook's lines"""
+    rows = []
+    missing = 0
+    for game in games:
+        try:
+            rows.append({
+                'Date': str(day),
+                'Home': game['home_team'],
+                'Away': game['away_team'],
+                'OU': game['total'][sportsbook],
+                'Spread': game['away_spread'][sportsbook],
+                'ML_Home': game['home_ml'][sportsbook],
+                'ML_Away': game['away_ml'][sportsbook],
+                'Points': game['away_score'] + game['home_score'],
+                'Win_Margin': game['home_score'] - game['away_score'],
+            })
+        except KeyError:
+            missing += 1
+    return rows, missing
 
 
 @task(log_prints=True)
 def fetch_odd_data(config, odd_db_path):
     """Fetch betting odds data from sportsbooks"""
     sportsbook = 'bet365'
+    mutable_days = collection_settings(config)[0]
+    settings = config.get('odds-engine', {})
+    limiter = TokenBucket(settings.get('rate', 1.0), settings.get('burst', 1))
     conn = sqlite3.connect(odd_db_path)
+    report = {'days': 0, 'games': 0, 'missing': 0, 'failed': 0}
 
     for season_key, season_value in config['fetch-odd-data'].items():
+        table = f'odds_{season_key}'
+        stored = set()
+        if table in list_odds_tables(conn):
+            stored = {row[0] for row in conn.execute(f'SELECT DISTINCT "Date" FROM "{table}"')}
+        done = pending_watermarks(conn, 'odds', stored, config)
+
         current_day = datetime.strptime(season_value['start_date'], "%Y-%m-%d").date()
         end_date = datetime.strptime(season_value['end_date'], "%Y-%m-%d").date()
-        data = []
-
+        days = []
         while current_day <= end_date:
-            print(f"Fetching odds: {current_day}")
-            sb = Scoreboard(date=current_day)
-
-            if not hasattr(sb, "games"):
-                current_day = current_day + timedelta(days=1)
-                continue
-
-            for game in sb.games:
+            if str(current_day) not in done:
+                days.append(current_day)
+            current_day = current_day + timedelta(days=1)
+        print(f"{len(days)} odds dates to fetch for {season_key}")
+
+        # Days are scraped concurrently under the shared rate cap and written here as they
+        # arrive, each committed with its watermark so partial progress survives a failure
+        with ThreadPoolExecutor(max_workers=settings.get('max-workers', 4)) as executor:
+            futures = {executor.submit(fetch_scoreboard_games, date=day, limiter=limiter): day for day in days}
+            for future in as_completed(futures):
+                day = futures.pop(future)
                 try:
-                    data.append({
-                        'Date': current_day,
-                        'Home': game['home_team'],
-                        'Away': game['away_team'],
-                        'OU': game['total'][sportsbook],
-                        'Spread': game['away_spread'][sportsbook],
-                        'ML_Home': game['home_ml'][sportsbook],
-                        'ML_Away': game['away_ml'][sportsbook],
-                        'Points': game['away_score'] + game['home_score'],
-                        'Win_Margin': game['home_score'] - game['away_score'],
-                    })
-                except KeyError:
-                    print(f"No {sportsbook} odds data for: {game}")
+                    games = future.result()
+                except CacheMiss:
+                    print(f"No cached odds for {day} (offline)")
+                    continue
+                except Exception as e:
+                    report['failed'] += 1
+                    print(f"Failed fetching odds {day}: {e}")
+                    continue
 
-            current_day = current_day + timedelta(days=1)
-            time.sleep(random.uniform(0.3, 1.0))
+                rows, missing = odds_rows(games, day, sportsbook)
+                write_odds_day(conn, table, day, rows)
+                mark_collected(conn, 'odds', day, mutable_days)
+                conn.commit()
+                print(f"Fetched odds {day}: {len(rows)} games")
 
-        df = pd.DataFrame(data)
-        df.to_sql(f'odds_{season_key}', conn, if_exists="replace", index=True)
+                report['days'] += 1
+                report['games'] += len(rows)
+                report['missing'] += missing
 
     conn.close()
-    print("Odds data fetching completed.")
+    print(f"Odds data fetching completed: {report['days']} days, {report['games']} games stored, "
+          f"{report['missing']} games without {sportsbook} odds, {report['failed']} days failed.")
+
+
+def list_odds_tables(conn):
+    """List every per-season odds table stored in OddData.db"""
+    names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return sorted(name for name in names if name.startswith('odds_'))
+
+
+def compute_rest_days(table_keys, dates, home_teams, away_teams):
+    """Compute (home, away) rest days for games listed in chronological row order
+
+    Home and away are interleaved into one long per-team sequence so a single
+    grouped diff gives the days since each team's previous game in the same table.
+    A team's first game gets 10 and every other gap is capped at 9.
+    """
+    dates = pd.to_datetime(pd.Series(dates, dtype=str).str.extract(r'(\d{4}-\d{2}-\d{2})')[0])
+    games = pd.DataFrame({
+        'Table': np.repeat(np.asarray(table_keys), 2),
+        'Team': np.column_stack([home_teams, away_teams]).ravel(),
+        'Date': np.repeat(dates.to_numpy(), 2),
+    })
+    days_diff = games.groupby(['Table', 'Team'], sort=False)['Date'].diff().dt.days.to_numpy()
+    rest = np.where(np.isnan(days_diff), 10, np.where((days_diff > 0) & (days_diff < 9), days_diff, 9))
+    rest = rest.astype(float).reshape(-1, 2)
+    return rest[:, 0], rest[:, 1]
 
 
 @task(log_prints=True)
 def process_odd_data(odd_db_path):
     """Process odd data to calculate rest days for teams"""
+    started = time.perf_counter()
     conn = sqlite3.connect(odd_db_path)
-    tables = [
-        'odds_2010-11', 'odds_2011-12', 'odds_2012-13', 'odds_2013-14', 'odds_2014-15', 'odds_2015-16',
-        'odds_2016-17', 'odds_2017-18', 'odds_2018-19', 'odds_2019-20', 'odds_2020-21', 'odds_2021-22',
-        'odds_2022-23', 'odds_2023-24', 'odds_2024-25'
-    ]
-
-    def get_date(date_string):
-        year, month, day = re.search(r'(\d{4})-(\d{2})-(\d{2})', date_string).groups()
-        return datetime.strptime(f"{year}-{month}-{day}", '%Y-%m-%d')
 
-    for table in tqdm(tables):
+    tables = {}
+    for table in list_odds_tables(conn):
         try:
+            # Odds days are appended in arrival order, rest days need them chronological
             data = pd.read_sql_query(f'SELECT * FROM "{table}"', conn, index_col="index")
-            teams_last_played = {}
-
-            for index, row in data.iterrows():
-                if 'Home' not in row or 'Away' not in row:
-                    continue
-
-                # Process home team rest days
-                if row['Home'] not in teams_last_played:
-                    teams_last_played[row['Home']] = get_date(row['Date'])
-                    home_games_rested = 10
-                else:
-                    current_date = get_date(row['Date'])
-                    days_diff = (current_date - teams_last_played[row['Home']]).days
-                    home_games_rested = days_diff if 0 < days_diff < 9 else 9
-                    teams_last_played[row['Home']] = current_date
-
-                # Process away team rest days
-                if row['Away'] not in teams_last_played:
-                    teams_last_played[row['Away']] = get_date(row['Date'])
-                    away_games_rested = 10
-                else:
-                    current_date = get_date(row['Date'])
-                    days_diff = (current_date - teams_last_played[row['Away']]).days
-                    away_games_rested = days_diff if 0 < days_diff < 9 else 9
-                    teams_last_played[row['Away']] = current_date
-
-                data.at[index, 'Days_Rest_Home'] = home_games_rested
-                data.at[index, 'Days_Rest_Away'] = away_games_rested
+            tables[table] = data.sort_values('Date', kind='stable') if 'Date' in data else data
+        except Exception as e:
+            print(f"Error processing {table}: {e}")
 
+    # Every season goes through the rest-days computation together
+    games = [table for table, data in tables.items() if len(data) and 'Home' in data and 'Away' in data]
+    if games:
+        rest_home, rest_away = compute_rest_days(
+            np.concatenate([np.full(len(tables[table]), table) for table in games]),
+            np.concatenate([tables[table]['Date'].astype(str).to_numpy() for table in games]),
+            np.concatenate([tables[table]['Home'].to_numpy() for table in games]),
+            np.concatenate([tables[table]['Away'].to_numpy() for table in games]),
+        )
+        offset = 0
+        for table in games:
+            data = tables[table]
+            data['Days_Rest_Home'] = rest_home[offset:offset + len(data)]
+            data['Days_Rest_Away'] = rest_away[offset:offset + len(data)]
+            offset += len(data)
+
+    for table, data in tqdm(tables.items()):
+        try:
             data.to_sql(table, conn, if_exists="replace")
         except Exception as e:
             print(f"Error processing {table}: {e}")
 
     conn.close()
+    metrics.record_throughput('odds_rows_processed', sum(len(data) for data in tables.values()),
+                              time.perf_counter() - started)
     print("Odds data processing completed.")
 
 
-@task(log_prints=True)
-def merge_data(config, team_db_path, odd_db_path, output_db_path):
-    """Merge team stats and odds data into final dataset"""
-    team_conn = sqlite3.connect(team_db_path)
-    odd_conn = sqlite3.connect(odd_db_path)
-    conn = sqlite3.connect(output_db_path)
+def load_season_snapshots(team_conn, storage, season, dates):
+    """Load the team snapshots for a season's dates once, stacked in (Date, index) order"""
+    dates = sorted(set(dates))
+    if not dates:
+        return pd.DataFrame(columns=['TEAM_NAME', 'Date'])
+    if storage == 'long':
+        snapshots = read_team_snapshots(team_conn, season=season, start_date=dates[0], end_date=dates[-1])
+        columns = [col for col in snapshots.columns if col not in ('Date', 'Season', 'index')]
+        return snapshots[columns + ['Date']]
 
-    scores = []
-    win_margin = []
-    OU = []
-    OU_Cover = []
-    games = []
-    days_rest_away = []
-    days_rest_home = []
+    frames = []
+    for date in dates:
+        try:
+            frames.append(pd.read_sql_query(f'SELECT * FROM "{date}"', team_conn, index_col='index').sort_index())
+        except Exception:
+            continue
+    if not frames:
+        return pd.DataFrame(columns=['TEAM_NAME', 'Date'])
+    return pd.concat(frames, ignore_index=True)
 
-    for key, value in config['create-game'].items():
-        season = key
-        print(f'Processing {season}')
 
-        try:
-            odds_df = pd.read_sql_query(f'SELECT * FROM "odds_{key}"', odd_conn, index_col='index')
+def plan_season_merge(odds_df, digests, partition):
+    """Decide how much of a season has to be merged again
 
-            for row in odds_df.itertuples():
-                home_team = row.Home
-                away_team = row.Away
-                date = row.Date
+    Returns (mode, odds rows to merge, fingerprint): 'skip' when the inputs match the stored
+    fingerprint, 'append' when everything up to the last merged date is unchanged and only
+    later games are new, and 'replace' (every row) otherwise.
+    """
+    fingerprint = season_fingerprint(odds_df, digests)
+    if partition is None:
+        return 'replace', odds_df, fingerprint
+    if partition['fingerprint'] == fingerprint:
+        return 'skip', odds_df.iloc[:0], fingerprint
+    dates = odds_df['Date'].astype(str)
+    last_date = partition['last_date']
+    if last_date is not None and season_fingerprint(odds_df[dates <= last_date], digests) == partition['fingerprint']:
+        return 'append', odds_df[dates > last_date], fingerprint
+    return 'replace', odds_df, fingerprint
+
+
+def merge_changed_seasons(config, storage, team_conn, odd_conn, partitions):
+    """Merge the seasons whose inputs changed; returns {season: (mode, frame, fingerprint, last date)}"""
+    updates = {}
+    for season in config['create-game']:
+        try:
+            odds_df = pd.read_sql_query(f'SELECT * FROM "odds_{season}"', odd_conn, index_col='index')
+            dates = odds_df['Date'].astype(str)
+            digests = snapshot_digests(team_conn, storage, dates)
+            mode, rows, fingerprint = plan_season_merge(odds_df, digests, partitions.get(season))
+            if mode == 'skip':
+                print(f'{season} unchanged, skipping')
+                continue
 
-                try:
-                    team_df = pd.read_sql_query(f'SELECT * FROM "{date}"', team_conn, index_col='index')
-
-                    if len(team_df.index) == 30:
-                        scores.append(row.Points)
-                        OU.append(row.OU)
-                        days_rest_home.append(row.Days_Rest_Home)
-                        days_rest_away.append(row.Days_Rest_Away)
-
-                        # Set win margin binary value
-                        win_margin.append(1 if row.Win_Margin > 0 else 0)
-
-                        # Set OU cover binary value
-                        OU_Cover.append(1 if row.Points > row.OU else 0)
-
-                        # Get correct team index based on season
-                        if season in ('2010-11', '2011-12'):
-                            home_team_series = team_df.iloc[team_index_10.get(home_team)]
-                            away_team_series = team_df.iloc[team_index_10.get(away_team)]
-                        elif season == '2012-13':
-                            home_team_series = team_df.iloc[team_index_12.get(home_team)]
-                            away_team_series = team_df.iloc[team_index_12.get(away_team)]
-                        elif season == '2013-14':
-                            home_team_series = team_df.iloc[team_index_13.get(home_team)]
-                            away_team_series = team_df.iloc[team_index_13.get(away_team)]
-                        elif season in ('2022-23', '2023-24', '2024-25'):
-                            home_team_series = team_df.iloc[team_index_current.get(home_team)]
-                            away_team_series = team_df.iloc[team_index_current.get(away_team)]
-                        else:
-                            home_team_series = team_df.iloc[team_index_14.get(home_team)]
-                            away_team_series = team_df.iloc[team_index_14.get(away_team)]
-
-                        # Concatenate home and away team data
-                        game = pd.concat([
-                            home_team_series,
-                            away_team_series.rename(index={col: f'{col}.1' for col in team_df.columns.values})
-                        ])
-                        games.append(game)
-                except Exception as e:
-                    print(f"Error processing game {date}, {home_team} vs {away_team}: {e}")
+            print(f'Processing {season}' + (f' ({len(rows)} new games)' if mode == 'append' else ''))
+            frame = pd.DataFrame()
+            if len(rows):
+                snapshots = load_season_snapshots(team_conn, storage, season, rows['Date'].astype(str))
+                with metrics.timer('merge_season_seconds', season=season):
+                    frame = merge_season(season, rows, snapshots)
+            frame['Season'] = season
+            updates[season] = (mode, frame, fingerprint, dates.max() if len(dates) else None)
         except Exception as e:
             print(f"Error processing season {season}: {e}")
+    return updates
+
+
+def merge_season(season, odds_df, snapshots):
+    """Join home and away team snapshots onto a season's odds rows with array gathers"""
+    # Row of every franchise in each date's snapshot, matched by team name instead of row position
+    snapshot_dates, date_of_row, counts = np.unique(
+        snapshots['Date'].astype(str).to_numpy(), return_inverse=True, return_counts=True
+    )
+    snapshot_teams = franchise_ids(snapshots['TEAM_NAME'].to_numpy(), snapshots['Date'])
+    named = snapshot_teams != UNKNOWN
+    franchise_row = np.full((len(snapshot_dates), N_FRANCHISES), UNKNOWN, dtype=np.int64)
+    franchise_row[date_of_row[named], snapshot_teams[named]] = np.flatnonzero(named)
+
+    date_position = pd.Index(snapshot_dates).get_indexer(odds_df['Date'].astype(str))
+    has_snapshot = date_position >= 0
+    complete = np.zeros(len(odds_df), dtype=bool)
+    complete[has_snapshot] = counts[date_position[has_snapshot]] == 30
+
+    home_team = franchise_ids(odds_df['Home'].to_numpy(), odds_df['Date'])
+    away_team = franchise_ids(odds_df['Away'].to_numpy(), odds_df['Date'])
+    known_teams = (home_team != UNKNOWN) & (away_team != UNKNOWN)
+
+    missing = int((~has_snapshot).sum())
+    if missing:
+        print(f"No team snapshot for {missing} games in {season}")
+    for row in odds_df[has_snapshot & ~known_teams].itertuples():
+        print(f"Error processing game {row.Date}, {row.Home} vs {row.Away}: unknown team")
+
+    keep = complete & known_teams
+    home_rows = np.full(len(odds_df), UNKNOWN, dtype=np.int64)
+    away_rows = np.full(len(odds_df), UNKNOWN, dtype=np.int64)
+    home_rows[keep] = franchise_row[date_position[keep], home_team[keep]]
+    away_rows[keep] = franchise_row[date_position[keep], away_team[keep]]
+    # A full snapshot still lacks a team whose name is not in the franchise table
+    unmatched = keep & ((home_rows == UNKNOWN) | (away_rows == UNKNOWN))
+    for row in odds_df[unmatched].itertuples():
+        print(f"Error processing game {row.Date}, {row.Home} vs {row.Away}: team missing from the snapshot")
+    keep &= ~unmatched
+    odds_df = odds_df[keep]
+    home_rows = home_rows[keep]
+    away_rows = away_rows[keep]
+
+    # Gather whole column blocks at once instead of building one Series per game
+    team_columns = [col for col in snapshots.columns if col != 'TEAM_ID']
+    text_columns = [col for col in team_columns if 'TEAM_' in col or 'Date' in col]
+    home = {}
+    away = {}
+    for col in team_columns:
+        values = snapshots[col].to_numpy()
+        if col not in text_columns:
+            values = values.astype(float)
+        home[col] = values[home_rows]
+        away[f'{col}.1'] = values[away_rows]
+
+    frame = pd.DataFrame({**home, **away})
+    frame['Score'] = odds_df['Points'].to_numpy(dtype=float)
+    frame['Home-Team-Win'] = (odds_df['Win_Margin'].to_numpy() > 0).astype(float)
+    frame['OU'] = odds_df['OU'].to_numpy(dtype=float)
+    frame['OU-Cover'] = (odds_df['Points'].to_numpy() > odds_df['OU'].to_numpy()).astype(float)
+    frame['Days-Rest-Home'] = odds_df['Days_Rest_Home'].to_numpy(dtype=float)
+    frame['Days-Rest-Away'] = odds_df['Days_Rest_Away'].to_numpy(dtype=float)
+
+    # Closing prices are kept for backtesting; they are not model features
+    frame['ML_Home'] = odds_df['ML_Home'].to_numpy(dtype=float)
+    frame['ML_Away'] = odds_df['ML_Away'].to_numpy(dtype=float)
+    return frame
 
-    # Create final dataset
-    if games:
-        season = pd.concat(games, ignore_index=True, axis=1)
-        season = season.T
-        frame = season.drop(columns=['TEAM_ID', 'TEAM_ID.1'])
-        frame['Score'] = np.asarray(scores)
-        frame['Home-Team-Win'] = np.asarray(win_margin)
-        frame['OU'] = np.asarray(OU)
-        frame['OU-Cover'] = np.asarray(OU_Cover)
-        frame['Days-Rest-Home'] = np.asarray(days_rest_home)
-        frame['Days-Rest-Away'] = np.asarray(days_rest_away)
-
-        # Convert numeric columns to float
-        for field in frame.columns.values:
-            if 'TEAM_' in field or 'Date' in field or field not in frame:
-                continue
-            frame[field] = frame[field].astype(float)
 
-        frame.to_sql('dataset', conn, if_exists='replace')
-        print(f"Final dataset created with {len(frame)} records")
-    else:
-        print("No games data to merge")
+@task(log_prints=True)
+def merge_data(config, team_db_path, odd_db_path, output_db_path):
+    """Merge team stats and odds data into the dataset, one season partition at a time
+
+    Each season's rows are tagged with a fingerprint of its odds rows and the team
+    snapshots they reference. Unchanged seasons are skipped, games after a season's last
+    merged date are appended, and any other change re-merges just that season.
+    """
+    started = time.perf_counter()
+    storage = team_storage_mode(config)
+    store_dir = columnar_path(output_db_path)
+    columnar_current = is_current(store_dir, output_db_path)
+    team_conn = sqlite3.connect(team_db_path)
+    odd_conn = sqlite3.connect(odd_db_path)
+    conn = sqlite3.connect(output_db_path)
+
+    partitions = read_partitions(conn)
+    stored_columns = dataset_columns(conn)
+    # A dataset merged before it was partitioned by season is rebuilt once
+    rebuild = not partitions or stored_columns is None or 'Season' not in stored_columns
+    updates = merge_changed_seasons(config, storage, team_conn, odd_conn, {} if rebuild else partitions)
+    if not rebuild and any(len(frame) and list(frame.columns) != stored_columns
+                           for _, frame, _, _ in updates.values()):
+        print("Team stat columns changed, re-merging every season")
+        rebuild = True
+        updates = merge_changed_seasons(config, storage, team_conn, odd_conn, {})
+    removed = [season for season in partitions if season not in config['create-game']]
+
+    merged = sum(len(frame) for _, frame, _, _ in updates.values())
+    changed = rebuild or bool(updates) or bool(removed)
+    if changed:
+        # Rows and fingerprints of every season are committed in one transaction
+        conn.execute('BEGIN')
+        if rebuild:
+            conn.execute(f'DROP TABLE IF EXISTS "{DATASET_TABLE}"')
+            conn.execute(f'DELETE FROM "{PARTITIONS_TABLE}"')
+        for season in removed:
+            drop_partition(conn, season)
+        for season, (mode, frame, fingerprint, last_date) in updates.items():
+            write_partition(conn, season, frame, fingerprint, last_date, append=mode == 'append')
+        conn.commit()
+        metrics.record_throughput('dataset_rows_merged', merged, time.perf_counter() - started)
+    total = conn.execute(f'SELECT COUNT(*) FROM "{DATASET_TABLE}"').fetchone()[0] if dataset_columns(conn) else 0
+    print(f"Dataset has {total} records ({merged} merged from {len(updates)} changed seasons)")
+
+    # The columnar copy only rewrites changed seasons, unless it was already out of date
+    columnar = config.get('dataset', {}).get('columnar', False) and total > 0
+    incremental = columnar_current and not rebuild
+    frame = None
+    if columnar and (changed or not columnar_current):
+        if rebuild:
+            frame = pd.concat([updates[season][1] for season in sorted(updates)], ignore_index=True)
+        else:
+            frame = read_table(conn, seasons=list(updates) if incremental else None)
 
     conn.close()
     team_conn.close()
     odd_conn.close()
+
+    # Written after Dataset.db is closed so it records the final file state
+    if frame is not None:
+        keep = set(partitions) - set(updates) - set(removed) if incremental else ()
+        write_dataset(frame, frame['Season'].to_numpy(), store_dir, source_path=output_db_path, keep=keep)
+        print(f"Columnar dataset written to {store_dir}")
     print("Data merging completed.")
 
 
@@ -292,8 +601,8 @@ def data_collection_pipeline(
     Comprehensive Data Collection Pipeline
 
     Phases:
-    1. Process CSV odds data
-    2. Fetch team statistics and odds data in parallel
+    1. Process CSV odds data (and migrate legacy team tables when storage is 'long')
+    2. Fetch team statistics (per date, or derived from season game logs) and odds data in parallel
     3. Process odd data with rest days
     4. Merge collected data
     """
@@ -302,14 +611,21 @@ def data_collection_pipeline(
     os.makedirs(os.path.dirname(odd_db_path), exist_ok=True)
     os.makedirs(os.path.dirname(output_db_path), exist_ok=True)
     config = toml.load(config_path)
+    if get_cache() is None:
+        configure_cache(config.get('cache', {}), mutable_days=collection_settings(config)[0])
 
     # Process CSV file first
     process_csv_file(config, odd_db_path)
 
+    # Fold any legacy per-date team tables into the long layout before appending to it
+    if team_storage_mode(config) == 'long':
+        migrate_team_data(config, team_db_path)
+
     # Run team data and odds data fetching in parallel using .submit()
     task_runner = ThreadPoolTaskRunner()
     with task_runner:
-        team_future = fetch_team_data.submit(config, team_db_path)
+        fetch_team_task = fetch_team_game_logs if team_data_source(config) == 'game-log' else fetch_team_data
+        team_future = fetch_team_task.submit(config, team_db_path)
         odds_future = fetch_odd_data.submit(config, odd_db_path)
         team_result = team_future.result()
         odds_result = odds_future.result()
@@ -7,20 +7,13 @@ of the NBA prediction pipeline with Prefect integration.
 import argparse
 import sys
 import os
-from colorama import init, deinit
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(project_root)
 
-from pipeline.data_collection_pipeline import main as data_collection_main
-from pipeline.model_training_pipeline import main as model_training_main
-from pipeline.prediction_pipeline import prediction_pipeline
-from pipeline.utils.today_odds import get_sbr_odds
-from pipeline.utils.tools import (
-    fetch_today_games_json,
-    create_games_from_odds,
-    create_todays_games_list
-)
+# Books selectable with --sportsbook; 'all' compares every book in the scrape.
+# Defined here so building the parser imports nothing.
+SPORTSBOOKS = ['fanduel', 'draftkings', 'betmgm', 'pointsbet', 'caesars', 'wynn', 'bet_rivers_ny']
 
 
 def check_odds_data(odds, games):
@@ -43,40 +36,132 @@ def main():
 
     # Stage selection
     parser.add_argument('--stage',
-                        choices=['collect', 'train', 'predict', 'all'],
+                        choices=['collect', 'train', 'predict', 'backtest', 'serve', 'record', 'replay', 'all'],
                         default='predict',
                         help='Pipeline stage to run')
 
     # Prediction-specific options
     parser.add_argument('--sportsbook',
                         default='fanduel',
-                        choices=['fanduel', 'draftkings', 'betmgm', 'pointsbet',
-                                 'caesars', 'wynn', 'bet_rivers_ny'],
-                        help='Sportsbook to fetch odds from')
+                        choices=SPORTSBOOKS + ['all'],
+                        help='Sportsbook to fetch odds from (all: compare every book in one scrape)')
 
     parser.add_argument('--kc',
                         action='store_true',
                         help='Use Kelly Criterion for betting recommendations')
 
+    parser.add_argument('--no-orchestrator',
+                        action='store_true',
+                        help='Run the prediction steps as plain function calls instead of a Prefect flow')
+
+    parser.add_argument('--offline',
+                        action='store_true',
+                        help='Serve stats.nba.com and SBR responses from the on-disk cache only')
+
+    parser.add_argument('--replay',
+                        action='store_true',
+                        help='Send stats.nba.com, data.nba.com and SBR requests to the local replay server '
+                             '(see [replay] in config.toml and --stage replay)')
+
+    parser.add_argument('--record-responses',
+                        action='store_true',
+                        help='Record every live response into the [replay] cassette')
+
+    parser.add_argument('--profile',
+                        nargs='?', const='metrics', choices=['metrics', 'cprofile', 'pyinstrument'],
+                        help='Collect stage timings and counters (metrics.json, metrics.prom); '
+                             'cprofile/pyinstrument also profile each stage')
+
     # Logging and verbosity
     parser.add_argument('-v', '--verbose',
                         action='store_true',
                         help='Increase output verbosity')
 
     args = parser.parse_args()
+
+    # Nothing beyond argparse is imported until the arguments are parsed, so --help stays
+    # instant; stage modules pull in Prefect, LightGBM, scikit-learn and sbrscrape and are
+    # imported only when their stage runs (see benchmarks/startup_time.py)
+    import toml
+    from colorama import init, deinit
+    from pipeline.utils.response_cache import configure_cache
+    from pipeline.utils.metrics import enable_metrics, profile_stage, write_metrics
     init()
 
+    config_path = os.path.join(project_root, 'config.toml')
+    config = toml.load(config_path) if os.path.exists(config_path) else {}
+    configure_cache(config.get('cache', {}), offline=args.offline or None,
+                    mutable_days=config.get('collection', {}).get('mutable-days', 1))
+    replay_settings = config.get('replay', {})
+    if args.replay or args.record_responses:
+        from pipeline.utils.replay import configure_replay
+        configure_replay(
+            base_url=f"http://{replay_settings.get('host', '127.0.0.1')}:{replay_settings.get('port', 8766)}"
+            if args.replay else None,
+            record_path=replay_settings.get('cassette', '../data/replay/cassette.db') if args.record_responses else None,
+        )
+
+    profile_dir = config.get('profiling', {}).get('output', '../data/profiles')
+    if args.profile:
+        enable_metrics()
+
+    def stage(name):
+        return profile_stage(name, profile_dir, None if args.profile == 'metrics' else args.profile)
+
     try:
         if args.stage in ['collect', 'all']:
             print("🏀 Starting Data Collection Pipeline...")
-            data_collection_main()
+            from pipeline.data_collection_pipeline import main as data_collection_main
+            with stage('collect'):
+                data_collection_main()
 
         if args.stage in ['train', 'all']:
             print("📊 Starting Model Training Pipeline...")
-            model_training_main()
+            from pipeline.model_training_pipeline import main as model_training_main
+            with stage('train'):
+                model_training_main()
+
+        if args.stage == 'backtest':
+            print("📈 Starting Backtesting Pipeline...")
+            from pipeline.backtest_pipeline import main as backtest_main
+            with stage('backtest'):
+                backtest_main()
+
+        if args.stage == 'serve':
+            print("🛰️ Starting Prediction Server...")
+            from pipeline.prediction_server import serve
+            with stage('serve'):
+                serve(sportsbook=args.sportsbook, settings=config.get('server', {}))
+
+        if args.stage == 'record':
+            print("📼 Starting Line Movement Recorder...")
+            from pipeline.utils.line_recorder import LineRecorder, ScoreboardSource, FixtureSource, run_recorder
+            settings = config.get('recorder', {})
+            source = FixtureSource(settings['fixture']) if settings.get('fixture') else \
+                ScoreboardSource(sport=settings.get('sport', 'NBA'))
+            recorder = LineRecorder(settings.get('path', '../data/LineMoves.db'))
+            try:
+                with stage('record'):
+                    run_recorder(source, recorder, interval=settings.get('interval', 60))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                recorder.close()
+
+        if args.stage == 'replay':
+            print("🎞️ Starting Replay Server...")
+            from pipeline.utils.replay import serve_replay
+            serve_replay(replay_settings)
 
         if args.stage in ['predict', 'all']:
             print("🎲 Starting Prediction Pipeline...")
+            from pipeline.prediction_pipeline import prediction_pipeline, run_prediction
+            from pipeline.utils.today_odds import get_sbr_odds
+            from pipeline.utils.tools import (
+                fetch_today_games_json,
+                create_games_from_odds,
+                create_todays_games_list
+            )
 
             # Get odds data
             odds = None
@@ -91,10 +176,14 @@ def main():
                 games = create_todays_games_list(data)
 
             # Run prediction pipeline with appropriate model
-            prediction_pipeline(
-                sportsbook=args.sportsbook,
-                use_kelly_criterion=args.kc,
-            )
+            with stage('predict'):
+                if args.no_orchestrator:
+                    run_prediction(sportsbook=args.sportsbook, use_kelly_criterion=args.kc, orchestrator=False)
+                else:
+                    prediction_pipeline(
+                        sportsbook=args.sportsbook,
+                        use_kelly_criterion=args.kc,
+                    )
 
         print("🏆 Pipeline Completed Successfully!")
 
@@ -102,6 +191,8 @@ def main():
         print(f"❌ Pipeline Execution Failed: {e}")
         sys.exit(1)
     finally:
+        if args.profile:
+            print(f"Metrics written to {write_metrics(profile_dir)}")
         deinit()
 
 
@@ -2,145 +2,82 @@
 Machine Learning Model Training Pipeline for NBA Predictions
 """
 import os
-import pickle
-from datetime import datetime
-import numpy as np
-import pandas as pd
-import sqlite3
-import lightgbm as lgb
-from sklearn.model_selection import StratifiedKFold
-from sklearn.metrics import precision_score
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import toml
 from prefect import flow
+from pipeline.utils.feature_store import materialize_features, load_features
+from pipeline.utils.hyperparameter_search import (
+    TrialStore, init_worker, run_search, fit_final_model, study_name
+)
+from pipeline.utils.model_registry import register_model
+
+TARGET_NAMES = {'ML': 'Money Line', 'OU': 'Over/Under'}
+
+
+def train_model(store_dir, target, dataset_hash, settings, executor):
+    """Search hyperparameters for one target, then refit the best configuration on every row"""
+    name = TARGET_NAMES.get(target, target)
+    print(f"Training {name} Prediction Model")
+
+    # Zero-copy view of the materialized design matrix
+    X, y, _ = load_features(store_dir, target)
+
+    seed = settings.get('seed', 100)
+    store = TrialStore(settings.get('trials-db', '../model/trials.db'))
+    best = run_search(
+        study_name(settings.get('study', 'lgbm'), target, dataset_hash), target, y, executor, store,
+        n_trials=settings.get('n-trials', 40),
+        n_folds=settings.get('n-folds', 5),
+        early_stopping_rounds=settings.get('early-stopping-rounds', 50),
+        seed=seed,
+    )
+    store.close()
+
+    trial, params, best_precision, n_estimators = best
+    print(f"Best {name} trial {trial}: {params}")
+    best_model = fit_final_model(X, y, params, n_estimators, seed=seed)
+    return best_model, best_precision
 
 
 @flow(log_prints=True)
 def model_training_pipeline(
         dataset_path='../data/Dataset.db',
-        model_output_path='../model'
+        model_output_path='../model',
+        config_path='../config.toml'
 ):
     """
     Comprehensive Machine Learning Model Training Pipeline
 
     Phases:
-    1. Load and preprocess data
-    2. Train Money Line prediction model
-    3. Train Over/Under prediction model
-    4. Save best performing models
+    1. Materialize the float32 feature store (skipped when Dataset.db is unchanged)
+    2. Search Money Line and Over/Under hyperparameters concurrently on one process pool
+    3. Refit the best configuration for each target and add it to the model registry
     """
     # Ensure model output directory exists
     os.makedirs(model_output_path, exist_ok=True)
-
-    # Load dataset
-    conn = sqlite3.connect(dataset_path)
-    data = pd.read_sql('SELECT * FROM dataset', conn)
-
-    # Prepare Money Line Model
-    def train_ml_model():
-        print("Training Money Line Prediction Model")
-
-        # Prepare data
-        y = data['Home-Team-Win']
-        X = data.drop(['Home-Team-Win', 'Score', 'OU', 'OU-Cover',
-                       'TEAM_NAME.1','TEAM_NAME', 'Date','index','Date.1'], axis=1)
-        X = X.values.astype(float)
-
-        best_precision = 0
-        best_model = None
-
-        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=100)
-
-        for iteration in range(100):
-            for train_index, test_index in cv.split(X, y):
-                X_train, X_test = X[train_index], X[test_index]
-                y_train, y_test = y.iloc[train_index], y.iloc[test_index]
-
-                # LightGBM parameters
-                params = {
-                    'objective': 'binary',
-                    'learning_rate': 0.05,
-                    'max_depth': 10,
-                    'min_child_samples': 20,
-                    'n_estimators': 500,
-                    'num_leaves': 30,
-                    'boosting_type': 'gbdt',
-                    'is_unbalance': False,
-                    'n_jobs': 4,
-                    'force_row_wise': True
-                }
-
-                model = lgb.LGBMClassifier(**params)
-                model.fit(X_train, y_train)
-
-                y_pred = model.predict(X_test)
-                precision = precision_score(y_test, y_pred)
-
-                if precision > best_precision:
-                    best_precision = precision
-                    best_model = model
-
-        # Save best model
-        model_filename = f'{model_output_path}/LGBM_{best_precision * 100:.2f}%_ML_model.pkl'
-        with open(model_filename, 'wb') as f:
-            pickle.dump(best_model, f)
-
-        print(f"Money Line Model trained with {best_precision * 100:.2f}% precision")
-        return best_precision
-
-    # Prepare Over/Under Model
-    def train_ou_model():
-        print("Training Over/Under Prediction Model")
-
-        # Prepare data
-        y = data['OU-Cover']
-        X = data.drop(['OU-Cover', 'Score', 'Home-Team-Win',
-                       'TEAM_NAME.1','TEAM_NAME', 'Date', 'index','Date.1'], axis=1)
-        X = X.values.astype(float)
-
-        best_precision = 0
-        best_model = None
-
-        cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=100)
-
-        for iteration in range(100):
-            for train_index, test_index in cv.split(X, y):
-                X_train, X_test = X[train_index], X[test_index]
-                y_train, y_test = y.iloc[train_index], y.iloc[test_index]
-
-                # LightGBM parameters
-                params = {
-                    'objective': 'binary',
-                    'learning_rate': 0.05,
-                    'max_depth': 10,
-                    'min_child_samples': 20,
-                    'n_estimators': 500,
-                    'num_leaves': 30,
-                    'boosting_type': 'gbdt',
-                    'is_unbalance': False,
-                    'n_jobs': 4,
-                    'force_row_wise': True
-                }
-
-                model = lgb.LGBMClassifier(**params)
-                model.fit(X_train, y_train)
-
-                y_pred = model.predict(X_test)
-                precision = precision_score(y_test, y_pred)
-
-                if precision > best_precision:
-                    best_precision = precision
-                    best_model = model
-
-        # Save best model
-        model_filename = f'{model_output_path}/LGBM_{best_precision * 100:.2f}%_OU_model.pkl'
-        with open(model_filename, 'wb') as f:
-            pickle.dump(best_model, f)
-
-        print(f"Over/Under Model trained with {best_precision * 100:.2f}% precision")
-        return best_precision
-
-    # Execute model training
-    ml_precision = train_ml_model()
-    ou_precision = train_ou_model()
+    settings = toml.load(config_path).get('training', {}) if os.path.exists(config_path) else {}
+    settings.setdefault('trials-db', f'{model_output_path}/trials.db')
+    store_dir = settings.get('feature-store', '../data/features')
+
+    manifest = materialize_features(dataset_path, store_dir)
+    targets = list(manifest['targets'])
+
+    # Both targets share the pool, so folds of one fill the gaps left by the other
+    max_workers = settings.get('max-workers') or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(store_dir,)) as executor, \
+            ThreadPoolExecutor(max_workers=len(targets)) as drivers:
+        futures = {target: drivers.submit(train_model, store_dir, target, manifest['dataset_hash'],
+                                             settings, executor) for target in targets}
+        results = {target: future.result() for target, future in futures.items()}
+
+    for target, (model, precision) in results.items():
+        entry = register_model(
+            model.booster_, target, manifest['targets'][target]['features'], manifest['dataset_hash'],
+            {'precision': precision}, model.get_params(),
+            registry_dir=model_output_path, promote=settings.get('promote', 'best'),
+        )
+        print(f"{TARGET_NAMES.get(target, target)} Model trained with {precision * 100:.2f}% precision "
+              f"(registered as {target}/{entry['version']})")
 
 
 def main():
@@ -150,4 +87,4 @@ def main():
     model_training_pipeline()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
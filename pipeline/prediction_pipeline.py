@@ -5,20 +5,36 @@ import os
 import sys
 import pickle
 import random
+import time
 from datetime import datetime
 import numpy as np
 import pandas as pd
 from prefect import flow, task
 from colorama import Fore, Style, init, deinit
 
-from pipeline.utils.today_odds import get_sbr_odds
+from pipeline.utils.today_odds import get_sbr_odds, get_all_book_odds
+from pipeline.utils.book_odds import summary_to_odds
+from pipeline.utils.franchises import is_known_team
 from pipeline.utils.today_game import create_today_game
-from pipeline.utils.expected_value import expected_value
-from pipeline.utils import kelly_criterion as kc
+from pipeline.utils.expected_value import as_odds, expected_values
+from pipeline.utils.kelly_criterion import kelly_fractions
 from pipeline.utils.tools import fetch_json_data, convert_json_to_df
+from pipeline.utils.model_registry import load_active_model, predict_proba
+from pipeline.utils import metrics
 import logging
 
 logging.getLogger("prefect").setLevel(logging.CRITICAL)
+
+TEAM_STATS_URL = 'https://stats.nba.com/stats/leaguedashteamstats?' \
+                 'Conference=&DateFrom=&DateTo=&Division=&GameScope=&' \
+                 'GameSegment=&LastNGames=0&LeagueID=00&Location=&' \
+                 'MeasureType=Base&Month=0&OpponentTeamID=0&Outcome=&' \
+                 'PORound=0&PaceAdjust=N&PerMode=PerGame&Period=0&' \
+                 'PlayerExperience=&PlayerPosition=&PlusMinus=N&Rank=N&' \
+                 'Season=2024-25&SeasonSegment=&SeasonType=Regular+Season&ShotClockRange=&' \
+                 'StarterBench=&TeamID=0&TwoWay=0&VsConference=&VsDivision='
+
+
 @task(log_prints=False)
 def get_random_color():
     """Task to get random color for output formatting"""
@@ -31,6 +47,10 @@ def get_random_color():
 def load_models(model_type='lgbm'):
     """Task to load prediction models"""
     if model_type == 'lgbm':
+        # Active registry models, falling back to the legacy pickles
+        ml_model, ou_model = load_active_model('ML'), load_active_model('OU')
+        if ml_model is not None and ou_model is not None:
+            return ml_model, ou_model
         with open('../model/LGBM_ML_model.pkl', 'rb') as f:
             ml_model = pickle.load(f)
         with open('../model/LGBM_UO_model.pkl', 'rb') as f:
@@ -71,8 +91,8 @@ def display_betting_analysis(home_team, away_team, ml_prediction, team_odds, ev_
     bankroll_home, bankroll_away = bankroll_fractions
 
     # Color coding
-    home_team_color = get_random_color()
-    away_team_color = get_random_color()
+    home_team_color = get_random_color.fn()
+    away_team_color = get_random_color.fn()
     ev_home_color = Fore.GREEN if ev_home > 0 else Fore.RED
     ev_away_color = Fore.GREEN if ev_away > 0 else Fore.RED
     bankroll_color = Fore.GREEN + Style.BRIGHT if bankroll_home > 0 else Fore.RED + Style.BRIGHT
@@ -88,95 +108,147 @@ def display_betting_analysis(home_team, away_team, ml_prediction, team_odds, ev_
           f"{str(bankroll_away)}%{Style.RESET_ALL}")
 
 
-@flow(log_prints=False)
-def prediction_pipeline(
-        sportsbook='fanduel',
-        use_kelly_criterion=False,
-        model_type='lgbm'
-):
+@task(log_prints=False)
+def display_line_shopping(home_team, away_team, p_home, book_line, ev_home, ev_away, kelly_home, kelly_away):
+    """Task to display best lines, consensus and EV across every book for one game"""
+    best_home, home_book, best_away, away_book, consensus_home, books_positive, arbitrage_margin = book_line
+    consensus = f"{consensus_home * 100:.1f}%" if not np.isnan(consensus_home) else "n/a"
+    ev_color = lambda ev: Fore.GREEN if ev > 0 else Fore.RED
+    print(f"{Style.BRIGHT}{home_team}{Style.RESET_ALL} {best_home:+.0f} ({home_book}) vs "
+          f"{Style.BRIGHT}{away_team}{Style.RESET_ALL} {best_away:+.0f} ({away_book}) | "
+          f"model {p_home * 100:.1f}% vs consensus {consensus} | "
+          f"EV {ev_color(ev_home)}{ev_home:+.2f}{Style.RESET_ALL} / {ev_color(ev_away)}{ev_away:+.2f}{Style.RESET_ALL} | "
+          f"Kelly {kelly_home:.2f}% / {kelly_away:.2f}% | +EV lines: {books_positive}"
+          + (f" | {Fore.YELLOW}{Style.BRIGHT}ARBITRAGE {arbitrage_margin * 100:.2f}%{Style.RESET_ALL}"
+             if arbitrage_margin > 0 else ""))
+
+
+def render_line_shopping(games, ml_predictions, book_odds, summary, orchestrator=True):
+    """EV/Kelly of every book's money lines for one inference pass; rows follow `games`"""
+    step = (lambda t: t) if orchestrator else (lambda t: t.fn)
+    row = {matchup: i for i, matchup in enumerate(book_odds['matchups'])}
+    rows = np.array([row[game] for game in games], dtype=int)
+    p_home, p_away = ml_predictions[:, 1], ml_predictions[:, 0]
+
+    # (games, books) EV grids; the best line is also the best EV, so Kelly is sized there
+    ev_home = expected_values(p_home[:, None], book_odds['home_ml'][rows])
+    ev_away = expected_values(p_away[:, None], book_odds['away_ml'][rows])
+    books_positive = (np.nan_to_num(ev_home) > 0).sum(axis=1) + (np.nan_to_num(ev_away) > 0).sum(axis=1)
+    best_home, best_away = summary['best_home'][rows], summary['best_away'][rows]
+    kelly_home = np.nan_to_num(kelly_fractions(best_home, p_home))
+    kelly_away = np.nan_to_num(kelly_fractions(best_away, p_away))
+    best_ev_home = np.nan_to_num(expected_values(p_home, best_home))
+    best_ev_away = np.nan_to_num(expected_values(p_away, best_away))
+
+    print(f"{Style.BRIGHT}{Fore.YELLOW}------------ Line Shopping ({len(book_odds['books'])} books) "
+          f"------------{Style.RESET_ALL}")
+    for i, (home_team, away_team) in enumerate(games):
+        r = rows[i]
+        step(display_line_shopping)(
+            home_team, away_team, float(p_home[i]),
+            (best_home[i], summary['best_home_book'][r], best_away[i], summary['best_away_book'][r],
+             summary['consensus_home'][r], int(books_positive[i]), summary['arbitrage_margin'][r]),
+            float(best_ev_home[i]), float(best_ev_away[i]), float(kelly_home[i]), float(kelly_away[i])
+        )
+
+
+def render_slate(games, ml_predictions, ou_predictions, todays_games_uo, home_team_odds, away_team_odds,
+                 use_kelly_criterion=False, orchestrator=True):
+    """Print predictions (and EV/Kelly) for a slate; without the orchestrator the tasks run as plain calls"""
+    step = (lambda t: t) if orchestrator else (lambda t: t.fn)
+
+    print(f"{Fore.GREEN}{Style.BRIGHT}------------- NBA Game Predictions -------------{Style.RESET_ALL}")
+
+    for count, (home_team, away_team) in enumerate(games):
+        step(display_prediction)(
+            home_team, away_team,
+            ml_predictions[count],
+            ou_predictions[count],
+            todays_games_uo[count]
+        )
+
+    if use_kelly_criterion:
+        print(
+            f"{Style.BRIGHT}{Fore.YELLOW}------------Expected Value & Kelly Criterion-----------{Style.RESET_ALL}")
+
+        # EV and Kelly for every game in one call; a missing line shows EV 0 and no stake
+        home_odds, away_odds = as_odds(home_team_odds), as_odds(away_team_odds)
+        has_lines = ~np.isnan(home_odds) & ~np.isnan(away_odds)
+        ev_home = np.where(has_lines, expected_values(ml_predictions[:, 1], home_odds), 0)
+        ev_away = np.where(has_lines, expected_values(ml_predictions[:, 0], away_odds), 0)
+        bankroll_home = np.nan_to_num(kelly_fractions(home_odds, ml_predictions[:, 1]))
+        bankroll_away = np.nan_to_num(kelly_fractions(away_odds, ml_predictions[:, 0]))
+
+        for i, (home_team, away_team) in enumerate(games):
+            step(display_betting_analysis)(
+                home_team, away_team,
+                ml_predictions[i],
+                (home_team_odds[i], away_team_odds[i]),
+                (float(ev_home[i]), float(ev_away[i])),
+                (float(bankroll_home[i]), float(bankroll_away[i]))
+            )
+
+
+def run_prediction(sportsbook='fanduel', use_kelly_criterion=False, model_type='lgbm', orchestrator=True):
     """
-    Comprehensive Prediction Pipeline with Prefect
+    Prediction steps shared by the Prefect flow and the --no-orchestrator mode
     """
+    step = (lambda t: t) if orchestrator else (lambda t: t.fn)
     init()
 
     try:
         # 1. Fetch today's games and odds
         print(f"Fetching games and odds from {sportsbook}")
-        odds = get_sbr_odds(sportsbook=sportsbook)
+        if sportsbook == 'all':
+            # One scrape for every book; predictions use the best money lines and the consensus total
+            book_odds, summary = get_all_book_odds()
+            odds = summary_to_odds(book_odds, summary)
+        else:
+            odds = get_sbr_odds(sportsbook=sportsbook)
         if not odds:
             print("No odds data available")
             return
 
-        # Prepare team data URL
-        data_url = 'https://stats.nba.com/stats/leaguedashteamstats?' \
-                   'Conference=&DateFrom=&DateTo=&Division=&GameScope=&' \
-                   'GameSegment=&LastNGames=0&LeagueID=00&Location=&' \
-                   'MeasureType=Base&Month=0&OpponentTeamID=0&Outcome=&' \
-                   'PORound=0&PaceAdjust=N&PerMode=PerGame&Period=0&' \
-                   'PlayerExperience=&PlayerPosition=&PlusMinus=N&Rank=N&' \
-                   'Season=2024-25&SeasonSegment=&SeasonType=Regular+Season&ShotClockRange=&' \
-                   'StarterBench=&TeamID=0&TwoWay=0&VsConference=&VsDivision='
-
         # Fetch and prepare data
-        raw_data = fetch_json_data(data_url)
+        raw_data = fetch_json_data(TEAM_STATS_URL)
         df = convert_json_to_df(raw_data)
 
-        # Create games list from odds
+        # Create games list from odds; teams without a stats row cannot be predicted
         games = [(teams.split(':')[0], teams.split(':')[1]) for teams in odds.keys()]
+        games = [game for game in games if is_known_team(game[0]) and is_known_team(game[1])]
 
         # 2. Prepare game data
         print("Preparing game data for prediction")
-        data, todays_games_uo, frame_ml, home_team_odds, away_team_odds = create_today_game(games, df, odds)
+        started = time.perf_counter()
+        # Later steps index by position, so they loop over the games that have feature rows
+        _, todays_games_uo, frame_ml, home_team_odds, away_team_odds, games = create_today_game(games, df, odds)
+        elapsed = time.perf_counter() - started
+        if not games:
+            print("No games with team stats to predict")
+            return
 
         # 3. Load models
         print(f"Loading {model_type.upper()} models")
-        ml_model, ou_model = load_models(model_type)
+        ml_model, ou_model = step(load_models)(model_type)
 
         # 4. Make predictions
         print("Running predictions")
-        ml_predictions = ml_model.predict_proba(data)
+        started = time.perf_counter()
+        # Registry models pick their features by name, in the order they were trained with
+        ml_predictions = predict_proba(ml_model, frame_ml)
 
         # Prepare OU data
         frame_uo = frame_ml.copy()
-        frame_uo['OU'] = np.asarray(todays_games_uo)
-        ou_data = frame_uo.values.astype(float)
-        ou_predictions = ou_model.predict_proba(ou_data)
-
-        # 5. Display Predictions
-        print(f"{Fore.GREEN}{Style.BRIGHT}------------- NBA Game Predictions -------------{Style.RESET_ALL}")
+        frame_uo['OU'] = np.asarray(todays_games_uo, dtype=float)
+        ou_predictions = predict_proba(ou_model, frame_uo)
+        # Preparation and inference only; model loading is timed by the stage
+        metrics.observe('prediction_seconds_per_game', (elapsed + time.perf_counter() - started) / max(len(games), 1))
 
-        for count, (home_team, away_team) in enumerate(games):
-            display_prediction(
-                home_team, away_team,
-                ml_predictions[count],
-                ou_predictions[count],
-                todays_games_uo[count]
-            )
-
-        # 6. Calculate Expected Value and Kelly Criterion
-        if use_kelly_criterion:
-            print(
-                f"{Style.BRIGHT}{Fore.YELLOW}------------Expected Value & Kelly Criterion-----------{Style.RESET_ALL}")
-
-            for i, (home_team, away_team) in enumerate(games):
-                ml_prediction = ml_predictions[i]
-
-                # Calculate EV and Kelly
-                ev_home = ev_away = 0
-                if home_team_odds[i] and away_team_odds[i]:
-                    ev_home = float(expected_value(ml_prediction[1], float(home_team_odds[i])))
-                    ev_away = float(expected_value(ml_prediction[0], float(away_team_odds[i])))
-
-                bankroll_home = kc.calculate_kelly_criterion(home_team_odds[i], ml_prediction[1])
-                bankroll_away = kc.calculate_kelly_criterion(away_team_odds[i], ml_prediction[0])
-
-                display_betting_analysis(
-                    home_team, away_team,
-                    ml_prediction,
-                    (home_team_odds[i], away_team_odds[i]),
-                    (ev_home, ev_away),
-                    (bankroll_home, bankroll_away)
-                )
+        # 5. Display Predictions, 6. Expected Value and Kelly Criterion
+        render_slate(games, ml_predictions, ou_predictions, todays_games_uo, home_team_odds, away_team_odds,
+                     use_kelly_criterion=use_kelly_criterion, orchestrator=orchestrator)
+        if sportsbook == 'all':
+            render_line_shopping(games, ml_predictions, book_odds, summary, orchestrator=orchestrator)
 
         print("Prediction pipeline completed successfully")
 
@@ -186,5 +258,17 @@ def prediction_pipeline(
         deinit()
 
 
+@flow(log_prints=False)
+def prediction_pipeline(
+        sportsbook='fanduel',
+        use_kelly_criterion=False,
+        model_type='lgbm'
+):
+    """
+    Comprehensive Prediction Pipeline with Prefect
+    """
+    run_prediction(sportsbook, use_kelly_criterion, model_type, orchestrator=True)
+
+
 if __name__ == "__main__":
     prediction_pipeline()
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Long-running local prediction server
+
+Keeps the models, team stats and odds in memory and answers slate predictions over HTTP:
+
+    GET  /health       model versions and refresh times
+    GET  /predictions  today's slate at the latest odds
+    POST /predictions  {"games": [{"home": ..., "away": ..., "home_odds": ..., "away_odds": ..., "total": ...}]}
+                       odds fields left out fall back to the latest scraped lines
+    POST /reload       refresh stats, odds and models now
+    GET  /metrics      request and prediction metrics in Prometheus text format
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+from pipeline.prediction_pipeline import TEAM_STATS_URL, load_models
+from pipeline.utils.today_odds import get_sbr_odds
+from pipeline.utils.today_game import create_today_game
+from pipeline.utils.expected_value import as_odds, expected_values
+from pipeline.utils.kelly_criterion import kelly_fractions
+from pipeline.utils.model_registry import REGISTRY_DIR, REGISTRY_FILE, predict_proba
+from pipeline.utils.franchises import is_known_team
+from pipeline.utils.tools import fetch_json_data, convert_json_to_df
+from pipeline.utils import metrics
+
+
+def _float_or_none(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+# Seconds between background refreshes, unless [server] stats-refresh / odds-refresh say otherwise
+STATS_REFRESH = 900
+ODDS_REFRESH = 300
+
+
+class PredictionService:
+    """Warm models, team stats and odds, refreshed in the background and swapped atomically"""
+
+    def __init__(self, sportsbook='fanduel', stats_refresh=STATS_REFRESH, odds_refresh=ODDS_REFRESH,
+                 registry_dir=REGISTRY_DIR):
+        self.sportsbook = sportsbook
+        self.stats_refresh = stats_refresh
+        self.odds_refresh = odds_refresh
+        self.registry_path = os.path.join(registry_dir, REGISTRY_FILE)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.models = None
+        self.models_mtime = None
+        self.stats = None
+        self.odds = {}
+        self.refreshed = {'models': None, 'stats': None, 'odds': None}
+
+    def _registry_mtime(self):
+        return os.stat(self.registry_path).st_mtime_ns if os.path.exists(self.registry_path) else None
+
+    def reload_models(self, force=False):
+        """Load the active models when the registry changed; in-flight requests keep the old pair"""
+        mtime = self._registry_mtime()
+        if not force and self.models is not None and mtime == self.models_mtime:
+            return False
+        models = load_models.fn()
+        with self._lock:
+            self.models, self.models_mtime = models, mtime
+            self.refreshed['models'] = datetime.now().isoformat(timespec='seconds')
+        print(f"Models loaded: {', '.join(self._model_versions())}")
+        return True
+
+    def refresh_stats(self):
+        stats = convert_json_to_df(fetch_json_data(TEAM_STATS_URL))
+        if stats.empty:
+            print("Team stats refresh returned no rows, keeping the previous stats")
+            return
+        with self._lock:
+            self.stats = stats
+            self.refreshed['stats'] = datetime.now().isoformat(timespec='seconds')
+
+    def refresh_odds(self):
+        odds = get_sbr_odds(sportsbook=self.sportsbook)
+        with self._lock:
+            self.odds = odds
+            self.refreshed['odds'] = datetime.now().isoformat(timespec='seconds')
+
+    def refresh_all(self):
+        self.refresh_stats()
+        self.refresh_odds()
+        self.reload_models(force=True)
+
+    def reload(self):
+        self.refresh_all()
+        return self.health()
+
+    def _refresh_loop(self, poll=1.0):
+        last = {'stats': time.monotonic(), 'odds': time.monotonic()}
+        while not self._stop.wait(poll):
+            for name, interval, refresh in (('stats', self.stats_refresh, self.refresh_stats),
+                                            ('odds', self.odds_refresh, self.refresh_odds)):
+                if time.monotonic() - last[name] >= interval:
+                    try:
+                        refresh()
+                    except Exception as e:
+                        print(f"Refreshing {name} failed: {e}")
+                    last[name] = time.monotonic()
+            try:
+                self.reload_models()
+            except Exception as e:
+                print(f"Reloading models failed: {e}")
+
+    def start(self):
+        self.refresh_all()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _model_versions(self):
+        versions = []
+        for model in self.models or ():
+            entry = getattr(model, 'entry', None)
+            versions.append(f"{entry['target']}/{entry['version']}" if entry else 'pickle')
+        return versions
+
+    def health(self):
+        with self._lock:
+            return {
+                'models': self._model_versions(),
+                'refreshed': dict(self.refreshed),
+                'games': len(self.odds),
+                'sportsbook': self.sportsbook,
+            }
+
+    def predict(self, requested=None):
+        """Predictions with EV and Kelly for the requested games, or the whole scraped slate"""
+        self.reload_models()
+        with self._lock:
+            (ml_model, ou_model), stats, scraped = self.models, self.stats, self.odds
+        if stats is None:
+            raise RuntimeError('Team stats are not loaded yet')
+
+        # Requested lines override the scraped ones game by game
+        odds = {}
+        games = []
+        for game in requested if requested is not None else [
+                {'home': key.split(':')[0], 'away': key.split(':')[1]} for key in scraped]:
+            home, away = game['home'], game['away']
+            if not is_known_team(home) or not is_known_team(away):
+                raise ValueError(f"Unknown team in {home} vs {away}")
+            line = scraped.get(f'{home}:{away}', {})
+            odds[f'{home}:{away}'] = {
+                'under_over_odds': game.get('total', line.get('under_over_odds')),
+                home: {'money_line_odds': game.get('home_odds', line.get(home, {}).get('money_line_odds'))},
+                away: {'money_line_odds': game.get('away_odds', line.get(away, {}).get('money_line_odds'))},
+            }
+            games.append((home, away))
+        if not games:
+            return []
+
+        started = time.perf_counter()
+        _, totals, frame, home_odds, away_odds, games = create_today_game(games, stats, odds)
+        if not games:
+            return []
+        ml_predictions = predict_proba(ml_model, frame)
+        ou_predictions = predict_proba(ou_model, frame.assign(OU=np.array(totals, dtype=float)))
+        metrics.observe('prediction_seconds_per_game', (time.perf_counter() - started) / len(games))
+
+        p_home, p_away = ml_predictions[:, 1], ml_predictions[:, 0]
+        ev_home, ev_away = expected_values(p_home, home_odds), expected_values(p_away, away_odds)
+        kelly_home, kelly_away = kelly_fractions(home_odds, p_home), kelly_fractions(away_odds, p_away)
+
+        return [{
+            'home': home,
+            'away': away,
+            'home_win_probability': _float_or_none(p_home[i]),
+            'over_probability': _float_or_none(ou_predictions[i, 1]),
+            'total': _float_or_none(np.array(totals[i], dtype=float)),
+            'home_odds': _float_or_none(as_odds(home_odds[i])),
+            'away_odds': _float_or_none(as_odds(away_odds[i])),
+            'ev_home': _float_or_none(ev_home[i]),
+            'ev_away': _float_or_none(ev_away[i]),
+            'kelly_home': _float_or_none(kelly_home[i]),
+            'kelly_away': _float_or_none(kelly_away[i]),
+        } for i, (home, away) in enumerate(games)]
+
+
+def requested_games(raw):
+    """The `games` list of a POST /predictions body; ValueError (answered with 400) when malformed"""
+    body = json.loads(raw)
+    if not isinstance(body, dict) or not isinstance(body.get('games'), list):
+        raise ValueError('Request body must be a JSON object with a "games" list')
+    if not all(isinstance(game, dict) for game in body['games']):
+        raise ValueError('Every entry of "games" must be an object with "home" and "away"')
+    return body['games']
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, action):
+        started = time.perf_counter()
+        status = 200
+        try:
+            body = action()
+        except (ValueError, KeyError) as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+        elapsed = time.perf_counter() - started
+        metrics.observe('server_request_seconds', elapsed, path=self.path, status=status)
+        if status == 200:
+            body['elapsed_ms'] = round(elapsed * 1000, 2)
+        self._send(status, body)
+
+    def _send_metrics(self):
+        registry = metrics.get_metrics()
+        if registry is None:
+            return self._send(404, {'error': 'Metrics are disabled'})
+        payload = registry.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/health':
+            return self._handle(self.service.health)
+        if self.path == '/predictions':
+            return self._handle(lambda: {'predictions': self.service.predict()})
+        if self.path == '/metrics':
+            return self._send_metrics()
+        self._send(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b'{}'
+        if self.path == '/predictions':
+            return self._handle(lambda: {'predictions': self.service.predict(requested_games(raw))})
+        if self.path == '/reload':
+            return self._handle(self.service.reload)
+        self._send(404, {'error': f'Unknown path {self.path}'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(sportsbook='fanduel', settings=None):
+    """Run the prediction server until interrupted"""
+    settings = settings or {}
+    # A long-running server always exposes /metrics
+    if metrics.get_metrics() is None:
+        metrics.enable_metrics()
+    service = PredictionService(
+        sportsbook=sportsbook,
+        stats_refresh=settings.get('stats-refresh', STATS_REFRESH),
+        odds_refresh=settings.get('odds-refresh', ODDS_REFRESH),
+    )
+    service.start()
+    handler = type('Handler', (PredictionHandler,), {'service': service})
+    host, port = settings.get('host', '127.0.0.1'), settings.get('port', 8765)
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Prediction server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,100 @@
+import itertools
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from .expected_value import cashouts, expected_values
+from .kelly_criterion import kelly_fractions
+
+
+def policy_grid(ev_thresholds, kelly_multipliers, max_stakes):
+    """Cartesian product of policy settings as aligned arrays (one entry per policy)"""
+    combos = np.array(list(itertools.product(ev_thresholds, kelly_multipliers, max_stakes)), dtype=float)
+    return {
+        'ev_threshold': combos[:, 0],
+        'kelly_fraction': combos[:, 1],
+        'max_stake': combos[:, 2],
+    }
+
+
+def walk_forward_probabilities(X, y, seasons, params, min_train_seasons=1):
+    """Out-of-sample P(y=1): each season is predicted by a model trained on all earlier seasons
+
+    Rows of the first `min_train_seasons` seasons are left as NaN.
+    """
+    order = list(dict.fromkeys(seasons))
+    probabilities = np.full(len(y), np.nan)
+    for position, season in enumerate(order):
+        if position < min_train_seasons:
+            continue
+        train = np.isin(seasons, order[:position])
+        test = seasons == season
+        model = lgb.LGBMClassifier(**params)
+        model.fit(X[train], y[train])
+        probabilities[test] = model.predict_proba(X[test])[:, 1]
+    return probabilities
+
+
+def bet_candidates(day, probability, odds, won, push=None):
+    """Stack per-game sides into flat candidate arrays sorted by day
+
+    `probability`, `odds` and `won` are (games, sides) arrays, e.g. home/away or over/under.
+    Candidates with a missing probability or price are dropped.
+    """
+    sides = probability.shape[1]
+    push = np.zeros_like(won, dtype=bool) if push is None else push
+    candidates = {
+        'day': np.repeat(day, sides),
+        'probability': probability.ravel(),
+        'odds': odds.ravel().astype(float),
+        'won': won.ravel().astype(bool),
+        'push': push.ravel().astype(bool),
+    }
+    valid = ~np.isnan(candidates['probability']) & ~np.isnan(candidates['odds']) & (candidates['odds'] != 0)
+    order = np.argsort(candidates['day'][valid], kind='stable')
+    return {key: values[valid][order] for key, values in candidates.items()}
+
+
+def simulate_policies(candidates, policies, initial_bankroll=100.0, max_exposure=1.0):
+    """Simulate bankroll growth for every policy at once
+
+    Stakes are fractions of the bankroll at the start of each day: a candidate is bet when
+    its EV per 100 staked exceeds the policy's threshold, sized at `kelly_fraction` of the
+    Kelly stake and capped at `max_stake`. A day's total stake is scaled down to
+    `max_exposure` when needed. Returns a per-policy summary and the (policies, days)
+    bankroll curves.
+    """
+    odds = candidates['odds']
+    probability = candidates['probability']
+    net_odds = cashouts(odds) / 100
+    ev = expected_values(probability, odds, decimals=None)
+    kelly = kelly_fractions(odds, probability, decimals=None) / 100
+    returns = np.where(candidates['push'], 0.0, np.where(candidates['won'], net_odds, -1.0))
+
+    # (policies, candidates) stake matrix
+    stakes = np.clip(policies['kelly_fraction'][:, None] * kelly[None, :], 0, policies['max_stake'][:, None])
+    stakes = np.where(ev[None, :] > policies['ev_threshold'][:, None], stakes, 0.0)
+
+    days, day_start = np.unique(candidates['day'], return_index=True)
+    exposure = np.add.reduceat(stakes, day_start, axis=1)
+    scale = np.where(exposure > max_exposure, max_exposure / np.maximum(exposure, 1e-12), 1.0)
+    daily_return = np.add.reduceat(stakes * returns[None, :], day_start, axis=1) * scale
+    with np.errstate(over='ignore'):
+        bankroll = initial_bankroll * np.cumprod(1 + daily_return, axis=1)
+
+    bets = stakes > 0
+    staked = np.add.reduceat(stakes, day_start, axis=1) * scale * np.hstack(
+        [np.full((len(stakes), 1), initial_bankroll), bankroll[:, :-1]]
+    )
+    peak = np.maximum.accumulate(bankroll, axis=1)
+    n_bets = bets.sum(axis=1)
+    summary = pd.DataFrame({
+        'ev_threshold': policies['ev_threshold'],
+        'kelly_fraction': policies['kelly_fraction'],
+        'max_stake': policies['max_stake'],
+        'bets': n_bets,
+        'hit_rate': np.where(n_bets > 0, (bets & candidates['won'][None, :]).sum(axis=1) / np.maximum(n_bets, 1), np.nan),
+        'final_bankroll': bankroll[:, -1],
+        'roi': (bankroll[:, -1] - initial_bankroll) / np.maximum(staked.sum(axis=1), 1e-12),
+        'max_drawdown': (1 - bankroll / peak).max(axis=1),
+    })
+    return summary, bankroll, days
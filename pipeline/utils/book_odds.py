@@ -0,0 +1,78 @@
+import warnings
+import numpy as np
+from .expected_value import cashouts, implied_probabilities, vig_free_probabilities
+
+
+def book_odds_arrays(games):
+    """Every book's lines from one Scoreboard scrape as (games, books) float arrays
+
+    Returns a dict with `matchups` [(home, away)], `books` and the `home_ml`, `away_ml` and
+    `total` arrays; a line a book does not offer is NaN.
+    """
+    books = sorted({book for game in games for key in ('home_ml', 'away_ml', 'total') for book in game[key]})
+    column = {book: j for j, book in enumerate(books)}
+    arrays = {key: np.full((len(games), len(books)), np.nan) for key in ('home_ml', 'away_ml', 'total')}
+    for i, game in enumerate(games):
+        for key, values in arrays.items():
+            for book, value in game[key].items():
+                if value is not None:
+                    values[i, column[book]] = value
+    # 0 means "no line" in the scrape, like in as_odds
+    for key in ('home_ml', 'away_ml'):
+        arrays[key][arrays[key] == 0] = np.nan
+    return {
+        'matchups': [(game['home_team'], game['away_team']) for game in games],
+        'books': books,
+        **arrays,
+    }
+
+
+def best_lines(prices, books):
+    """Highest-paying price per row and the book offering it (NaN / None where no book has a line)"""
+    payout = np.nan_to_num(cashouts(prices), nan=-np.inf)
+    column = payout.argmax(axis=1)
+    rows = np.arange(len(prices))
+    has_line = np.isfinite(payout[rows, column])
+    best = np.where(has_line, prices[rows, column], np.nan)
+    return best, [books[j] if ok else None for j, ok in zip(column, has_line)]
+
+
+def summarize_books(book_odds):
+    """Best lines, consensus and arbitrage per game across every book
+
+    Consensus probabilities are the median of each book's vig-free probabilities; an
+    arbitrage exists when the best home and away prices imply less than 100% in total.
+    """
+    home_ml, away_ml, books = book_odds['home_ml'], book_odds['away_ml'], book_odds['books']
+    best_home, best_home_book = best_lines(home_ml, books)
+    best_away, best_away_book = best_lines(away_ml, books)
+    vig_free_home, _ = vig_free_probabilities(home_ml, away_ml)
+    # All-NaN rows (a game no book prices yet) are expected and simply stay NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        consensus_home = np.nanmedian(vig_free_home, axis=1)
+        consensus_total = np.nanmedian(book_odds['total'], axis=1)
+    arbitrage_margin = 1 - (implied_probabilities(best_home) + implied_probabilities(best_away))
+    return {
+        'best_home': best_home,
+        'best_home_book': best_home_book,
+        'best_away': best_away,
+        'best_away_book': best_away_book,
+        'consensus_home': consensus_home,
+        'consensus_total': consensus_total,
+        'arbitrage_margin': arbitrage_margin,
+        'arbitrage': np.nan_to_num(arbitrage_margin, nan=-1) > 0,
+    }
+
+
+def summary_to_odds(book_odds, summary):
+    """get_sbr_odds-style dict at the best money lines and the consensus total"""
+    odds = {}
+    for i, (home, away) in enumerate(book_odds['matchups']):
+        total = summary['consensus_total'][i]
+        odds[f"{home}:{away}"] = {
+            'under_over_odds': None if np.isnan(total) else float(total),
+            home: {'money_line_odds': None if np.isnan(summary['best_home'][i]) else float(summary['best_home'][i])},
+            away: {'money_line_odds': None if np.isnan(summary['best_away'][i]) else float(summary['best_away'][i])},
+        }
+    return odds
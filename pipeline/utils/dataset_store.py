@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = 'manifest.json'
+DATASET_TABLE = 'dataset'
+PARTITIONS_TABLE = 'dataset_partitions'
+TEXT_COLUMNS = {'Season', 'TEAM_NAME', 'TEAM_NAME.1'}
+DATE_COLUMNS = {'Date', 'Date.1'}
+LABEL_COLUMNS = {'Home-Team-Win', 'OU-Cover'}
+# Game outcome and price columns keep full precision; team stats are float32 like the feature store
+GAME_COLUMNS = {'Score', 'OU', 'ML_Home', 'ML_Away'}
+
+
+def season_fingerprint(odds, digests):
+    """Hash of a season's merge inputs: its odds rows and the digests of the snapshots they reference"""
+    digest = hashlib.sha256('\x1f'.join(map(str, odds.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(odds, index=False).to_numpy().tobytes())
+    for date in sorted(set(odds['Date'].astype(str))):
+        digest.update(f"{date}={digests.get(date, '')};".encode())
+    return digest.hexdigest()
+
+
+def ensure_partitions_table(conn):
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{PARTITIONS_TABLE}" ('
+                 'season TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, last_date TEXT, '
+                 'rows INTEGER NOT NULL, merged_at TEXT NOT NULL)')
+
+
+def read_partitions(conn):
+    """Return {season: {'fingerprint', 'last_date', 'rows'}} for the seasons merged into Dataset.db"""
+    ensure_partitions_table(conn)
+    rows = conn.execute(f'SELECT season, fingerprint, last_date, rows FROM "{PARTITIONS_TABLE}"')
+    return {season: {'fingerprint': fingerprint, 'last_date': last_date, 'rows': count}
+            for season, fingerprint, last_date, count in rows}
+
+
+def dataset_columns(conn):
+    """Columns of the dataset table in order, or None when it does not exist"""
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{DATASET_TABLE}")')]
+    return columns or None
+
+
+def write_partition(conn, season, frame, fingerprint, last_date, append=False):
+    """Replace (or append to) one season's rows of the dataset table and record its fingerprint
+
+    Runs inside the caller's transaction, so rows and fingerprint are committed together
+    and an interrupted merge is simply redone.
+    """
+    column_defs = [f'"{col}" {"REAL" if pd.api.types.is_numeric_dtype(frame[col]) else "TEXT"}' for col in frame.columns]
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{DATASET_TABLE}" ({", ".join(column_defs)})')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{DATASET_TABLE}_season" ON "{DATASET_TABLE}" ("Season")')
+    if not append:
+        conn.execute(f'DELETE FROM "{DATASET_TABLE}" WHERE "Season" = ?', (season,))
+    quoted = ', '.join(f'"{col}"' for col in frame.columns)
+    placeholders = ', '.join('?' for _ in frame.columns)
+    rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+    conn.executemany(f'INSERT INTO "{DATASET_TABLE}" ({quoted}) VALUES ({placeholders})', rows)
+
+    count = conn.execute(f'SELECT COUNT(*) FROM "{DATASET_TABLE}" WHERE "Season" = ?', (season,)).fetchone()[0]
+    conn.execute(f'INSERT OR REPLACE INTO "{PARTITIONS_TABLE}" VALUES (?, ?, ?, ?, datetime(\'now\'))',
+                 (season, fingerprint, last_date, count))
+    return count
+
+
+def drop_partition(conn, season):
+    """Remove a season from the dataset table and forget its fingerprint"""
+    if dataset_columns(conn) is not None:
+        conn.execute(f'DELETE FROM "{DATASET_TABLE}" WHERE "Season" = ?', (season,))
+    conn.execute(f'DELETE FROM "{PARTITIONS_TABLE}" WHERE season = ?', (season,))
+
+
+def read_table(conn, columns=None, seasons=None):
+    """Read dataset rows from SQLite in (Season, insertion) order, optionally for some seasons only"""
+    stored = dataset_columns(conn) or []
+    selected = '*' if columns is None else ', '.join(f'[{column}]' for column in columns)
+    if 'Season' not in stored:
+        # Datasets merged before seasons were recorded hold a single unpartitioned table
+        if seasons is not None:
+            raise ValueError("Dataset.db predates season partitions, merge it again to select seasons")
+        return pd.read_sql(f'SELECT {selected} FROM "{DATASET_TABLE}"', conn)
+    where, params = '', []
+    if seasons is not None:
+        seasons = list(seasons)
+        where = f' WHERE "Season" IN ({", ".join("?" for _ in seasons)})'
+        params = seasons
+    return pd.read_sql(f'SELECT {selected} FROM "{DATASET_TABLE}"{where} ORDER BY "Season", rowid', conn,
+                       params=params)
+
+
+def columnar_path(dataset_path):
+    """Directory of the columnar copy of a Dataset.db (next to it, in dataset/)"""
+    return os.path.join(os.path.dirname(dataset_path), 'dataset')
+
+
+def column_block(column):
+    """Block (and with it the explicit on-disk dtype) a dataset column is stored in"""
+    if column in TEXT_COLUMNS:
+        return 'text'
+    if column in DATE_COLUMNS:
+        return 'date'
+    if column in LABEL_COLUMNS:
+        return 'int8'
+    if column in GAME_COLUMNS:
+        return 'float64'
+    return 'float32'
+
+
+BLOCK_DTYPES = {'date': 'datetime64[D]', 'int8': 'int8', 'float64': 'float64', 'float32': 'float32'}
+
+
+def _as_block_dtype(values, block):
+    if block == 'text':
+        return np.asarray(values, dtype=str)
+    if block == 'date':
+        dates = pd.to_datetime(pd.Series(values).astype(str).str[:10], errors='coerce')
+        return dates.to_numpy().astype('datetime64[D]')
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=BLOCK_DTYPES[block])
+
+
+def read_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(store_dir, manifest):
+    # Replaced last so a crash never leaves it pointing at partial partitions
+    tmp_path = os.path.join(store_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE))
+
+
+def write_dataset(frame, seasons, store_dir, source_path=None, keep=()):
+    """Write the merged dataset as one directory per season
+
+    Columns of the same dtype are stored together as one column-major (rows x columns)
+    .npy block per season, so a column is a contiguous slice of a memory map. Files are
+    uncompressed so reads never copy; `source_path` is the SQLite Dataset.db written
+    alongside, whose size and mtime mark the copy as current. Existing partitions of the
+    seasons in `keep` are left as they are, which needs an unchanged column layout.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    seasons = np.asarray(seasons)
+    blocks = {}
+    columns = []
+    for column in frame.columns:
+        block = column_block(column)
+        columns.append({'name': column, 'dtype': BLOCK_DTYPES.get(block, 'str'), 'block': block,
+                        'position': len(blocks.setdefault(block, []))})
+        blocks[block].append(column)
+
+    previous = read_manifest(store_dir) or {}
+    partitions = {season: entry for season, entry in previous.get('partitions', {}).items() if season in keep}
+    if partitions and previous['columns'] != columns:
+        raise ValueError("Column layout changed, every partition has to be rewritten")
+    for season in pd.unique(seasons):
+        rows = frame[seasons == season]
+        tmp_dir = os.path.join(store_dir, f'.{season}.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for block, names in blocks.items():
+            values = [_as_block_dtype(rows[name], block) for name in names]
+            dtype = np.result_type(*values) if block == 'text' else np.dtype(BLOCK_DTYPES[block])
+            array = np.empty((len(rows), len(names)), dtype=dtype, order='F')
+            for j, column_values in enumerate(values):
+                array[:, j] = column_values
+            np.save(os.path.join(tmp_dir, f'{block}.npy'), array)
+        shutil.rmtree(os.path.join(store_dir, season), ignore_errors=True)
+        os.replace(tmp_dir, os.path.join(store_dir, season))
+        partitions[season] = {'rows': len(rows)}
+
+    # Partitions of seasons no longer in the dataset are dropped
+    for season in set(previous.get('partitions', {})) - set(partitions):
+        shutil.rmtree(os.path.join(store_dir, season), ignore_errors=True)
+
+    partitions = {season: partitions[season] for season in sorted(partitions)}
+    manifest = {'columns': columns, 'partitions': partitions, 'source': None}
+    if source_path is not None:
+        stat = os.stat(source_path)
+        manifest['source'] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def is_current(store_dir, dataset_path):
+    """Whether the columnar copy was written from the Dataset.db as it is now"""
+    manifest = read_manifest(store_dir)
+    if manifest is None or manifest.get('source') is None or not os.path.exists(dataset_path):
+        return False
+    stat = os.stat(dataset_path)
+    return manifest['source'] == {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_columns(store_dir, columns=None, seasons=None):
+    """Memory-map the requested columns of the requested seasons (every one when None)
+
+    Returns {column: array}. With a single season every array is a read-only view of a
+    memory map; several seasons are concatenated in manifest order.
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No columnar dataset in {store_dir}")
+    layout = {column['name']: (column['block'], column['position']) for column in manifest['columns']}
+    columns = list(layout) if columns is None else list(columns)
+    unknown = [column for column in columns if column not in layout]
+    if unknown:
+        raise KeyError(f"Columns not in the dataset: {', '.join(unknown)}")
+    selected = [season for season in manifest['partitions'] if seasons is None or season in seasons]
+
+    # Only the blocks holding a requested column are opened
+    needed = {layout[column][0] for column in columns}
+    blocks = [{block: np.load(os.path.join(store_dir, season, f'{block}.npy'), mmap_mode='r') for block in needed}
+              for season in selected]
+    arrays = {}
+    for column in columns:
+        block, position = layout[column]
+        parts = [season_blocks[block][:, position] for season_blocks in blocks]
+        if len(parts) == 1:
+            arrays[column] = parts[0]
+        else:
+            arrays[column] = np.concatenate(parts) if parts else np.empty(0, dtype=BLOCK_DTYPES.get(block, str))
+    return arrays
+
+
+def read_dataset(store_dir, columns=None, seasons=None):
+    """read_columns as a DataFrame"""
+    return pd.DataFrame(read_columns(store_dir, columns, seasons), copy=False)
+
+
+def load_dataset(dataset_path, columns=None, seasons=None):
+    """Load the merged dataset, from its columnar copy when that is current, else from SQLite"""
+    store_dir = columnar_path(dataset_path)
+    if is_current(store_dir, dataset_path):
+        return read_dataset(store_dir, columns, seasons)
+    conn = sqlite3.connect(dataset_path)
+    data = read_table(conn, columns, seasons)
+    conn.close()
+    return data
@@ -1,10 +1,53 @@
+import numpy as np
+
+
+def as_odds(odds):
+    """American odds as a float array; None, NaN and 0 (no line) become NaN"""
+    odds = np.array(odds, dtype=float)
+    return np.where(odds == 0, np.nan, odds)
+
+
+def cashouts(odds):
+    """Profit on a winning 100 stake for each line (NaN where the line is missing)"""
+    odds = as_odds(odds)
+    with np.errstate(divide='ignore'):
+        return np.where(odds > 0, odds, (100 / (-1 * odds)) * 100)
+
+
+def expected_values(win_probability, odds, decimals=2):
+    """EV per 100 staked for arrays of probabilities and American odds
+
+    Pass decimals=None to skip rounding.
+    """
+    win_probability = np.asarray(win_probability, dtype=float)
+    ev = (win_probability * cashouts(odds)) - ((1 - win_probability) * 100)
+    return ev if decimals is None else np.round(ev, decimals)
+
+
+def implied_probabilities(odds):
+    """Break-even win probability of each line, including the bookmaker's margin"""
+    odds = as_odds(odds)
+    return np.where(odds > 0, 100 / (odds + 100), -odds / (100 - odds))
+
+
+def vig_free_probabilities(home_odds, away_odds):
+    """Implied probabilities of both sides normalised to sum to 1; returns (home, away)"""
+    home = implied_probabilities(home_odds)
+    away = implied_probabilities(away_odds)
+    total = home + away
+    return home / total, away / total
+
+
+def scalar_result(value, *inputs):
+    """A 0-d result as the scalar arithmetic on `inputs` would type it: a NumPy scalar when any
+    input is one, else a Python float. Python's round() then rounds it like the scalar code did."""
+    value = np.asarray(value)[()]
+    return value if any(isinstance(x, np.generic) for x in inputs) else value.item()
+
+
 def expected_value(winPercenetage, odds):
-    lossPercentage = 1 - winPercenetage
-    winMoney = cashout(odds)
-    return round((winPercenetage * winMoney) - (lossPercentage * 100), 2)
+    return round(scalar_result(expected_values(winPercenetage, odds, decimals=None), winPercenetage, odds), 2)
+
 
 def cashout(odds):
-    if odds > 0:
-        return odds
-    else:
-        return (100 / (-1 * odds)) * 100
\ No newline at end of file
+    return cashouts(odds).item()
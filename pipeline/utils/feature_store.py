@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import numpy as np
+from .dataset_store import load_dataset
+
+MANIFEST_FILE = 'manifest.json'
+NON_FEATURE_COLUMNS = ['TEAM_NAME.1', 'TEAM_NAME', 'Date', 'index', 'Date.1', 'ML_Home', 'ML_Away', 'Season']
+
+# Each target's label and the columns kept out of its design matrix
+FEATURE_TARGETS = {
+    'ML': {
+        'label': 'Home-Team-Win',
+        'drop': ['Home-Team-Win', 'Score', 'OU', 'OU-Cover'] + NON_FEATURE_COLUMNS,
+    },
+    'OU': {
+        'label': 'OU-Cover',
+        'drop': ['OU-Cover', 'Score', 'Home-Team-Win'] + NON_FEATURE_COLUMNS,
+    },
+}
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _is_current(manifest, store_dir, dataset_path, targets):
+    if manifest is None or set(targets) - set(manifest['targets']):
+        return False
+    files = [entry[key] for entry in manifest['targets'].values() for key in ('X', 'y')]
+    if not all(os.path.exists(os.path.join(store_dir, name)) for name in files):
+        return False
+    stat = os.stat(dataset_path)
+    if manifest['dataset_size'] == stat.st_size and manifest['dataset_mtime_ns'] == stat.st_mtime_ns:
+        return True
+    return manifest['dataset_hash'] == file_fingerprint(dataset_path)
+
+
+def materialize_features(dataset_path, store_dir, targets=FEATURE_TARGETS):
+    """Write each target's float32 design matrix and int8 labels as .npy files
+
+    Skipped entirely when the manifest already describes the same Dataset.db content.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    if _is_current(manifest, store_dir, dataset_path, targets):
+        print(f"Feature store up to date ({manifest['dataset_hash'][:12]}), skipping preprocessing")
+        return manifest
+
+    data = load_dataset(dataset_path)
+
+    stat = os.stat(dataset_path)
+    manifest = {
+        'dataset_hash': file_fingerprint(dataset_path),
+        'dataset_size': stat.st_size,
+        'dataset_mtime_ns': stat.st_mtime_ns,
+        'rows': len(data),
+        'targets': {},
+    }
+    for target, spec in targets.items():
+        features = data.drop(spec['drop'], axis=1, errors='ignore')
+        X = np.ascontiguousarray(features.to_numpy(dtype=np.float32))
+        y = data[spec['label']].to_numpy().astype(np.int8)
+        x_file, y_file = f'X_{target}.npy', f'y_{target}.npy'
+        np.save(os.path.join(store_dir, x_file), X)
+        np.save(os.path.join(store_dir, y_file), y)
+        manifest['targets'][target] = {
+            'label': spec['label'],
+            'features': list(features.columns),
+            'X': x_file,
+            'y': y_file,
+            'X_hash': hashlib.sha256(X.tobytes()).hexdigest(),
+        }
+
+    # Replace the manifest last so a crash never leaves it pointing at partial arrays
+    tmp_path = os.path.join(store_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_FILE))
+    print(f"Feature store materialized: {len(data)} rows, targets {', '.join(targets)}")
+    return manifest
+
+
+def load_features(store_dir, target):
+    """Memory-map a target's design matrix and labels; returns (X, y, feature_names)"""
+    manifest = read_manifest(store_dir)
+    entry = manifest['targets'][target]
+    X = np.load(os.path.join(store_dir, entry['X']), mmap_mode='r')
+    y = np.load(os.path.join(store_dir, entry['y']), mmap_mode='r')
+    return X, y, entry['features']
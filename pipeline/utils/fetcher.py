@@ -0,0 +1,172 @@
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from .tools import data_request_headers
+from .response_cache import get_cache, CacheMiss
+from . import metrics
+from .replay import get_replay_url, replay_url, record_response
+
+FETCH_OK = 'ok'
+FETCH_EMPTY = 'empty'
+FETCH_TIMEOUT = 'timeout'
+FETCH_ERROR = 'error'
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+FetchResult = namedtuple('FetchResult', ['key', 'url', 'status', 'data', 'attempts', 'error'])
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts up to `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(float(burst), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def create_session(pool_size, headers=None):
+    """Create a keep-alive session whose connection pool fits every worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(data_request_headers if headers is None else headers)
+    return session
+
+
+def result_sets(json_data):
+    """Return the stats.nba.com resultSets, or None when the response holds no rows"""
+    sets = json_data.get('resultSets') if isinstance(json_data, dict) else None
+    if not sets or not sets[0].get('rowSet'):
+        return None
+    return sets
+
+
+class RateLimitedFetcher:
+    """Fetch stats.nba.com JSON with bounded concurrency, a shared rate limit and retries
+
+    Timeouts and transport/HTTP errors are retried with exponential backoff, while a
+    well-formed response without rows is reported as empty straight away.
+    """
+
+    def __init__(self, rate=1.0, burst=1, max_workers=4, retries=3, backoff=1.0, timeout=30,
+                 headers=None, parse=result_sets, cache=None):
+        self.cache = get_cache() if cache is None else cache
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.parse = parse
+        self.session = create_session(max_workers, headers)
+
+    def _from_cache(self, key, url):
+        try:
+            payload = self.cache.get(url)
+        except CacheMiss:
+            return FetchResult(key, url, FETCH_ERROR, None, 0, 'not in cache (offline)')
+        if payload is None:
+            return None
+        data = self.parse(json.loads(payload))
+        return FetchResult(key, url, FETCH_OK if data is not None else FETCH_EMPTY, data, 0, None)
+
+    def fetch(self, key, url, as_of=None):
+        """Fetch one URL, retrying timeouts and retryable errors
+
+        `as_of` is the date the response describes; responses for final dates (see
+        ResponseCache) are cached permanently when a response cache is configured.
+        """
+        result = self._fetch(key, url, as_of)
+        metrics.inc('fetch_results_total', status=result.status, source='network' if result.attempts else 'cache')
+        return result
+
+    def _fetch(self, key, url, as_of):
+        if self.cache is not None:
+            cached = self._from_cache(key, url)
+            if cached is not None:
+                return cached
+
+        status, error = FETCH_ERROR, None
+        for attempt in range(1, self.retries + 2):
+            self.bucket.acquire()
+            retry_after = None
+            try:
+                with metrics.timer('http_request_seconds', client='fetcher'):
+                    response = self.session.get(replay_url(url), timeout=self.timeout)
+                if response.status_code in RETRY_STATUS_CODES:
+                    status, error = FETCH_ERROR, f"HTTP {response.status_code}"
+                    retry_after = response.headers.get('Retry-After')
+                elif response.status_code >= 400:
+                    return FetchResult(key, url, FETCH_ERROR, None, attempt, f"HTTP {response.status_code}")
+                else:
+                    data = self.parse(response.json())
+                    record_response(url, response.content)
+                    # Replayed responses are never stored under the live URL
+                    if self.cache is not None and get_replay_url() is None:
+                        self.cache.put(url, response.content, as_of=as_of if data is not None else None)
+                    if data is None:
+                        return FetchResult(key, url, FETCH_EMPTY, None, attempt, None)
+                    return FetchResult(key, url, FETCH_OK, data, attempt, None)
+            except requests.Timeout as e:
+                status, error = FETCH_TIMEOUT, str(e)
+            except (requests.RequestException, ValueError) as e:
+                status, error = FETCH_ERROR, str(e)
+
+            if attempt <= self.retries:
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                time.sleep(delay)
+
+        return FetchResult(key, url, status, None, self.retries + 1, error)
+
+    def fetch_many(self, requests_to_make):
+        """Fetch (key, url, as_of) requests concurrently, yielding results as they complete"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch, key, url, as_of) for key, url, as_of in requests_to_make]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fetcher_from_config(config, **overrides):
+    """Build a fetcher from the [fetch-engine] section of config.toml"""
+    settings = config.get('fetch-engine', {})
+    options = {
+        'rate': settings.get('rate', 1.0),
+        'burst': settings.get('burst', 1),
+        'max_workers': settings.get('max-workers', 4),
+        'retries': settings.get('retries', 3),
+        'backoff': settings.get('backoff', 1.0),
+        'timeout': settings.get('timeout', 30),
+    }
+    options.update(overrides)
+    return RateLimitedFetcher(**options)
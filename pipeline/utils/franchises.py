@@ -0,0 +1,153 @@
+"""
+Canonical NBA franchise table
+
+Every franchise has a stable integer ID (0-29, the position in FRANCHISES) used to index
+arrays, its stats.nba.com TEAM_ID, and the names it has been listed under together with
+the dates each name was in official use. Odds, schedules and stats snapshots spell teams
+differently ("LA Clippers", "Charlotte Bobcats" long after the rename), so lookups accept
+every alias regardless of date; dates only decide between franchises sharing a name.
+"""
+import numpy as np
+import pandas as pd
+
+UNKNOWN = -1
+
+# (current name, stats.nba.com TEAM_ID); the franchise ID is the position in this list
+FRANCHISES = [
+    ('Atlanta Hawks', 1610612737),
+    ('Boston Celtics', 1610612738),
+    ('Brooklyn Nets', 1610612751),
+    ('Charlotte Hornets', 1610612766),
+    ('Chicago Bulls', 1610612741),
+    ('Cleveland Cavaliers', 1610612739),
+    ('Dallas Mavericks', 1610612742),
+    ('Denver Nuggets', 1610612743),
+    ('Detroit Pistons', 1610612765),
+    ('Golden State Warriors', 1610612744),
+    ('Houston Rockets', 1610612745),
+    ('Indiana Pacers', 1610612754),
+    ('LA Clippers', 1610612746),
+    ('Los Angeles Lakers', 1610612747),
+    ('Memphis Grizzlies', 1610612763),
+    ('Miami Heat', 1610612748),
+    ('Milwaukee Bucks', 1610612749),
+    ('Minnesota Timberwolves', 1610612750),
+    ('New Orleans Pelicans', 1610612740),
+    ('New York Knicks', 1610612752),
+    ('Oklahoma City Thunder', 1610612760),
+    ('Orlando Magic', 1610612753),
+    ('Philadelphia 76ers', 1610612755),
+    ('Phoenix Suns', 1610612756),
+    ('Portland Trail Blazers', 1610612757),
+    ('Sacramento Kings', 1610612758),
+    ('San Antonio Spurs', 1610612759),
+    ('Toronto Raptors', 1610612761),
+    ('Utah Jazz', 1610612762),
+    ('Washington Wizards', 1610612764),
+]
+N_FRANCHISES = len(FRANCHISES)
+FRANCHISE_IDS = {name: franchise for franchise, (name, _) in enumerate(FRANCHISES)}
+
+# (name, franchise, first day, last day) for every name that differs from, or was used
+# in a limited period alongside, the current one; None leaves a range open
+ALIASES = [
+    ('New Jersey Nets', FRANCHISE_IDS['Brooklyn Nets'], None, '2012-06-30'),
+    ('Brooklyn Nets', FRANCHISE_IDS['Brooklyn Nets'], '2012-07-01', None),
+    ('Charlotte Bobcats', FRANCHISE_IDS['Charlotte Hornets'], '2004-07-01', '2014-06-30'),
+    ('Charlotte Hornets', FRANCHISE_IDS['Charlotte Hornets'], '2014-07-01', None),
+    ('Los Angeles Clippers', FRANCHISE_IDS['LA Clippers'], None, '2015-06-30'),
+    ('LA Clippers', FRANCHISE_IDS['LA Clippers'], '2015-07-01', None),
+    ('Vancouver Grizzlies', FRANCHISE_IDS['Memphis Grizzlies'], None, '2001-06-30'),
+    ('Memphis Grizzlies', FRANCHISE_IDS['Memphis Grizzlies'], '2001-07-01', None),
+    ('Charlotte Hornets', FRANCHISE_IDS['New Orleans Pelicans'], None, '2002-06-30'),
+    ('New Orleans Hornets', FRANCHISE_IDS['New Orleans Pelicans'], '2002-07-01', '2005-06-30'),
+    ('New Orleans/Oklahoma City Hornets', FRANCHISE_IDS['New Orleans Pelicans'], '2005-07-01', '2007-06-30'),
+    ('New Orleans Hornets', FRANCHISE_IDS['New Orleans Pelicans'], '2007-07-01', '2013-06-30'),
+    ('New Orleans Pelicans', FRANCHISE_IDS['New Orleans Pelicans'], '2013-07-01', None),
+    ('Seattle SuperSonics', FRANCHISE_IDS['Oklahoma City Thunder'], None, '2008-06-30'),
+    ('Oklahoma City Thunder', FRANCHISE_IDS['Oklahoma City Thunder'], '2008-07-01', None),
+]
+
+_FIRST_DAY = np.datetime64('1900-01-01')
+_LAST_DAY = np.datetime64('2100-12-31')
+
+
+def _name_table():
+    """Every known name with its validity range, current names open-ended unless aliased"""
+    aliased = {name for name, *_ in ALIASES}
+    names = [(name, franchise, None, None) for franchise, (name, _) in enumerate(FRANCHISES) if name not in aliased]
+    rows = []
+    for name, franchise, start, end in names + ALIASES:
+        rows.append((name, franchise, np.datetime64(start or _FIRST_DAY, 'D'), np.datetime64(end or _LAST_DAY, 'D')))
+    return rows
+
+
+NAMES = _name_table()
+# Without a date a name resolves to the franchise that used it last
+_LATEST = {name: franchise for name, franchise, _, _ in sorted(NAMES, key=lambda row: row[3])}
+_NAME_INDEX = pd.Index(list(_LATEST))
+_NAME_FRANCHISE = np.array(list(_LATEST.values()), dtype=np.int64)
+_SHARED = {name for name in _LATEST if len({row[1] for row in NAMES if row[0] == name}) > 1}
+
+
+def franchise_ids(names, dates=None):
+    """Vectorized name -> franchise ID, UNKNOWN (-1) for names not in the table
+
+    `dates` (one per name, or a single date) only matters for names used by more than
+    one franchise over time, such as "Charlotte Hornets".
+    """
+    names = np.asarray(names, dtype=object).reshape(-1)
+    position = _NAME_INDEX.get_indexer(names)
+    ids = np.where(position >= 0, _NAME_FRANCHISE[position], UNKNOWN)
+    if dates is None:
+        return ids
+
+    # Only rows with a shared name need their date parsed
+    shared = np.flatnonzero(pd.Index(names).isin(_SHARED))
+    if len(shared):
+        dates = np.broadcast_to(np.asarray(dates, dtype=object).reshape(-1), names.shape)[shared]
+        days = pd.to_datetime(pd.Series(dates).astype(str).str[:10], errors='coerce').to_numpy()
+        days = days.astype('datetime64[D]')
+        for name, franchise, start, end in NAMES:
+            if name in _SHARED:
+                ids[shared[(names[shared] == name) & (days >= start) & (days <= end)]] = franchise
+    return ids
+
+
+def franchise_id(name, date=None):
+    """franchise_ids for a single name"""
+    if date is None or name not in _SHARED:
+        return _LATEST.get(name, UNKNOWN)
+    return int(franchise_ids([name], [date])[0])
+
+
+def is_known_team(name):
+    return franchise_id(name) != UNKNOWN
+
+
+def nba_team_ids(franchises):
+    """stats.nba.com TEAM_IDs of franchise IDs"""
+    return np.array([team_id for _, team_id in FRANCHISES], dtype=np.int64)[np.asarray(franchises)]
+
+
+def team_names(date=None):
+    """Official team names on a date (today's without one), sorted as stats.nba.com lists them"""
+    day = np.datetime64(pd.Timestamp(date or 'today').date(), 'D')
+    names = {}
+    for name, franchise, start, end in NAMES:
+        if start <= day <= end:
+            names[franchise] = name
+    return sorted(names.values())
+
+
+def franchise_rows(names, dates=None):
+    """Row of each franchise in a table whose rows are teams, UNKNOWN where it has no row
+
+    Indexing the result with franchise IDs gathers rows by team identity, never by position,
+    so a reordered or incomplete stats response cannot shift one team's numbers onto another.
+    """
+    ids = franchise_ids(names, dates)
+    rows = np.full(N_FRANCHISES, UNKNOWN, dtype=np.int64)
+    known = ids != UNKNOWN
+    rows[ids[known]] = np.flatnonzero(known)
+    return rows
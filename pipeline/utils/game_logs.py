@@ -0,0 +1,155 @@
+"""
+Daily team snapshots derived from season game logs
+
+leaguegamelog returns every team's box score of every game of a season in one request.
+Cumulative sums over those rows give, for each date, the PerGame numbers and ranks that
+leaguedashteamstats reports with DateTo set to that date, without one request per day.
+"""
+import random
+import numpy as np
+import pandas as pd
+
+GAME_LOG_URL = ('https://stats.nba.com/stats/leaguegamelog?Counter=0&DateFrom=&DateTo=&Direction=ASC&LeagueID=00'
+                '&PlayerOrTeam=T&Season={0}&SeasonType=Regular+Season&Sorter=DATE')
+
+# Box score totals averaged per game; BLKA and PFD are taken from the opponent's row
+BOX_COLUMNS = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK',
+               'BLKA', 'PF', 'PFD', 'PTS', 'PLUS_MINUS']
+PERCENT_COLUMNS = {'FG_PCT': ('FGM', 'FGA'), 'FG3_PCT': ('FG3M', 'FG3A'), 'FT_PCT': ('FTM', 'FTA')}
+# leaguedashteamstats (MeasureType=Base, PerMode=PerGame) columns in API order
+STAT_COLUMNS = ['GP', 'W', 'L', 'W_PCT', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM', 'FTA',
+                'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'BLKA', 'PF', 'PFD', 'PTS', 'PLUS_MINUS']
+SNAPSHOT_COLUMNS = ['TEAM_ID', 'TEAM_NAME'] + STAT_COLUMNS + [f'{col}_RANK' for col in STAT_COLUMNS]
+# Ranked 1 for the lowest value instead of the highest
+ASCENDING_RANKS = {'L', 'TOV', 'BLKA', 'PF'}
+
+# Allowed absolute difference from the API snapshot, per kind of column
+TOLERANCES = {'count': 0, 'per-game': 0.1, 'percent': 0.001, 'rank': 1}
+
+
+def game_log_url(config, season_key):
+    """leaguegamelog URL of a season, from [data-url] game-log-url when configured"""
+    return config.get('data-url', {}).get('game-log-url', GAME_LOG_URL).format(season_key)
+
+
+def prepare_game_log(log):
+    """Completed games of a leaguegamelog frame with the opponent-derived BLKA and PFD columns"""
+    games = log[log['WL'].notna()].copy()
+    games['GAME_DATE'] = pd.to_datetime(games['GAME_DATE']).dt.strftime('%Y-%m-%d')
+    opponents = games[['GAME_ID', 'TEAM_ID', 'BLK', 'PF']].rename(
+        columns={'TEAM_ID': 'OPP_ID', 'BLK': 'BLKA', 'PF': 'PFD'})
+    games = games.merge(opponents, on='GAME_ID')
+    games = games[games['TEAM_ID'] != games['OPP_ID']]
+    # Team game logs count player minutes (240 in regulation); the dashboard reports game minutes
+    games['MIN'] = games['MIN'].astype(float) / 5
+    games['GP'] = 1
+    games['W'] = (games['WL'] == 'W').astype(int)
+    games['L'] = (games['WL'] == 'L').astype(int)
+    return games.sort_values(['TEAM_ID', 'GAME_DATE'], kind='stable').reset_index(drop=True)
+
+
+def _rank(values, ascending=False):
+    """Competition ('min') rank of each team within every date; NaN (not played yet) is never counted"""
+    if ascending:
+        better = values[:, None, :] < values[:, :, None]
+    else:
+        better = values[:, None, :] > values[:, :, None]
+    return 1 + better.sum(axis=2)
+
+
+def derive_snapshots(log, dates):
+    """Cumulative PerGame snapshots of every team for each date, as leaguedashteamstats returns them
+
+    Returns {date: frame} with the API columns and row order (teams sorted by name). Like
+    the API, a snapshot only lists teams that have played, and dates before the first game
+    are left out.
+    """
+    games = prepare_game_log(log)
+    dates = np.array(sorted({str(date) for date in dates}))
+    if games.empty or not len(dates):
+        return {}
+
+    names = games.groupby('TEAM_ID')['TEAM_NAME'].last().sort_values(kind='stable')
+    summed = ['GP', 'W', 'L', 'MIN'] + BOX_COLUMNS
+    cumulative = games.groupby('TEAM_ID')[summed].cumsum().to_numpy(dtype=float)
+    team_ids = games['TEAM_ID'].to_numpy()
+    game_dates = games['GAME_DATE'].to_numpy(dtype=str)
+
+    # Running totals of every team after its last game on or before each date
+    totals = np.zeros((len(dates), len(names), len(summed)))
+    for t, team_id in enumerate(names.index):
+        rows = np.flatnonzero(team_ids == team_id)
+        last = np.searchsorted(game_dates[rows], dates, side='right') - 1
+        played = last >= 0
+        totals[played, t] = cumulative[rows[last[played]]]
+    total = {col: totals[:, :, i] for i, col in enumerate(summed)}
+
+    games_played = total['GP']
+    played = games_played > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats = {'GP': games_played, 'W': total['W'], 'L': total['L'],
+                 'W_PCT': np.round(total['W'] / games_played, 3),
+                 'MIN': np.round(total['MIN'] / games_played, 1)}
+        for col in BOX_COLUMNS:
+            stats[col] = np.round(total[col] / games_played, 1)
+        for col, (made, attempted) in PERCENT_COLUMNS.items():
+            stats[col] = np.round(np.where(total[attempted] > 0, total[made] / total[attempted], 0.0), 3)
+    for col in stats:
+        stats[col] = np.where(played, stats[col], np.nan)
+
+    columns = {'Date': np.repeat(dates, len(names)),
+               'TEAM_ID': np.tile(names.index.to_numpy(), len(dates)),
+               'TEAM_NAME': np.tile(names.to_numpy(dtype=object), len(dates))}
+    for col in STAT_COLUMNS:
+        columns[col] = stats[col].ravel()
+    for col in STAT_COLUMNS:
+        columns[f'{col}_RANK'] = _rank(stats[col], col in ASCENDING_RANKS).ravel()
+    frame = pd.DataFrame(columns)[played.ravel()]
+    for col in ('GP', 'W', 'L'):
+        frame[col] = frame[col].astype(int)
+
+    return {date: snapshot.drop(columns='Date').reset_index(drop=True)
+            for date, snapshot in frame.groupby('Date', sort=True)}
+
+
+def sample_dates(dates, size, seed=0):
+    """A reproducible sample of `size` dates to check against the API"""
+    dates = sorted(dates)
+    return sorted(random.Random(seed).sample(dates, min(size, len(dates))))
+
+
+def _column_kind(column):
+    if column.endswith('_RANK'):
+        return 'rank'
+    if column in ('GP', 'W', 'L'):
+        return 'count'
+    if column.endswith('_PCT'):
+        return 'percent'
+    return 'per-game'
+
+
+def reconcile_snapshot(derived, api, tolerances=TOLERANCES):
+    """Compare a derived snapshot with the API's for the same date
+
+    Returns a report of schema differences, teams present on one side only and, per
+    column, the number of values outside the tolerance and the largest difference.
+    """
+    report = {
+        'missing_columns': [col for col in api.columns if col not in derived.columns],
+        'extra_columns': [col for col in derived.columns if col not in api.columns],
+        'missing_teams': sorted(set(api['TEAM_ID']) - set(derived['TEAM_ID'])),
+        'extra_teams': sorted(set(derived['TEAM_ID']) - set(api['TEAM_ID'])),
+        'mismatches': {},
+    }
+    joined = api.merge(derived, on='TEAM_ID', suffixes=('_api', ''))
+    for col in derived.columns:
+        if col in ('TEAM_ID', 'TEAM_NAME') or col not in api.columns:
+            continue
+        difference = (pd.to_numeric(joined[col], errors='coerce')
+                      - pd.to_numeric(joined[f'{col}_api'], errors='coerce')).abs()
+        outside = difference > tolerances[_column_kind(col)] + 1e-9
+        if outside.any():
+            report['mismatches'][col] = {'values': int(outside.sum()), 'max_difference': float(difference.max())}
+    report['ok'] = not any(report[key] for key in ('missing_columns', 'extra_columns', 'missing_teams',
+                                                   'extra_teams', 'mismatches'))
+    return report
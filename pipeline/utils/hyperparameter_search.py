@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import as_completed
+import numpy as np
+import lightgbm as lgb
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.metrics import precision_score
+from .feature_store import load_features
+from . import metrics
+
+# Parameters shared by every trial; n_estimators is only an upper bound for early stopping
+BASE_PARAMS = {
+    'objective': 'binary',
+    'boosting_type': 'gbdt',
+    'n_estimators': 2000,
+    'subsample_freq': 1,
+    'n_jobs': 1,
+    'force_row_wise': True,
+    'verbose': -1,
+}
+
+# The hand-tuned configuration the pipeline used before the search, evaluated as trial 0
+BASELINE_PARAMS = {
+    'learning_rate': 0.05,
+    'max_depth': 10,
+    'min_child_samples': 20,
+    'num_leaves': 30,
+    'subsample': 1.0,
+    'colsample_bytree': 1.0,
+    'reg_lambda': 0.0,
+}
+
+SEARCH_SPACE = {
+    'learning_rate': ('log', 0.01, 0.2),
+    'max_depth': ('int', 3, 12),
+    'min_child_samples': ('int', 10, 200),
+    'num_leaves': ('int', 8, 128),
+    'subsample': ('float', 0.5, 1.0),
+    'colsample_bytree': ('float', 0.3, 1.0),
+    'reg_lambda': ('log', 1e-3, 10.0),
+}
+
+
+def sample_params(seed, trial):
+    """Draw a configuration from SEARCH_SPACE, reproducible for a (seed, trial) pair"""
+    if trial == 0:
+        return dict(BASELINE_PARAMS)
+    rng = np.random.default_rng([seed, trial])
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        elif kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+_worker_data = {}
+
+
+def init_worker(store_dir):
+    """Process pool initializer: remember where the feature store lives"""
+    _worker_data['store_dir'] = store_dir
+
+
+def _worker_features(target):
+    # Memory-mapped once per worker; every process shares the same page cache
+    if target not in _worker_data:
+        X, y, _ = load_features(_worker_data['store_dir'], target)
+        _worker_data[target] = (X, y)
+    return _worker_data[target]
+
+
+def fit_fold(target, params, train_index, test_index, early_stopping_rounds, seed):
+    """Fit one CV fold with early stopping on a slice of its training rows
+
+    Returns (precision on the held-out fold, best iteration, seconds spent fitting).
+    """
+    started = time.perf_counter()
+    X, y = _worker_features(target)
+    fit_index, valid_index = train_test_split(
+        train_index, test_size=0.1, stratify=y[train_index], random_state=seed
+    )
+    model = lgb.LGBMClassifier(**BASE_PARAMS, **params, random_state=seed)
+    model.fit(
+        X[fit_index], y[fit_index],
+        eval_set=[(X[valid_index], y[valid_index])],
+        callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)],
+    )
+    y_pred = model.predict(X[test_index])
+    return (precision_score(y[test_index], y_pred, zero_division=0), int(model.best_iteration_ or 1),
+            time.perf_counter() - started)
+
+
+def study_name(study, target, dataset_hash):
+    """Trials are only comparable on the same data, so every Dataset.db content gets its own study"""
+    return f"{study}-{target}-{dataset_hash[:12]}"
+
+
+class TrialStore:
+    """SQLite log of evaluated trials so a study can be resumed or extended"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS trials ('
+                          'study TEXT NOT NULL, trial INTEGER NOT NULL, params TEXT NOT NULL, '
+                          'precision REAL NOT NULL, precision_std REAL NOT NULL, best_iteration INTEGER NOT NULL, '
+                          'duration REAL NOT NULL, created_at TEXT NOT NULL, PRIMARY KEY (study, trial))')
+        self.conn.commit()
+
+    def completed(self, study):
+        rows = self.conn.execute('SELECT trial FROM trials WHERE study = ?', (study,))
+        return {row[0] for row in rows}
+
+    def record(self, study, trial, params, precisions, iterations, duration):
+        self.conn.execute("INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                          (study, trial, json.dumps(params), float(np.mean(precisions)),
+                           float(np.std(precisions)), int(np.median(iterations)), duration))
+        self.conn.commit()
+
+    def best(self, study):
+        """Return (trial, params, precision, best_iteration) for the best trial of a study"""
+        row = self.conn.execute('SELECT trial, params, precision, best_iteration FROM trials '
+                                'WHERE study = ? ORDER BY precision DESC, trial LIMIT 1', (study,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2], row[3]
+
+    def close(self):
+        self.conn.close()
+
+
+def run_search(study, target, y, executor, store, n_trials=40, n_folds=5, early_stopping_rounds=50, seed=100):
+    """Evaluate every not-yet-completed trial of a study, running all folds on the executor
+
+    The executor's workers must have been initialised with `init_worker(store_dir)`.
+    """
+    done = store.completed(study)
+    trials = [trial for trial in range(n_trials) if trial not in done]
+    print(f"{study}: {len(done)} trials stored, evaluating {len(trials)} more")
+
+    cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    folds = list(cv.split(np.zeros(len(y)), y))
+
+    futures = {}
+    for trial in trials:
+        params = sample_params(seed, trial)
+        for train_index, test_index in folds:
+            future = executor.submit(fit_fold, target, params, train_index, test_index,
+                                     early_stopping_rounds, seed)
+            futures[future] = trial
+
+    results = {trial: [] for trial in trials}
+    search_started = time.perf_counter()
+    fits = 0
+    for future in as_completed(futures):
+        trial = futures.pop(future)
+        results[trial].append(future.result())
+        fits += 1
+        if len(results[trial]) == n_folds:
+            # Summed fit time of the folds, measured in the workers so queueing is not counted
+            precisions, iterations, durations = zip(*results.pop(trial))
+            store.record(study, trial, sample_params(seed, trial), precisions, iterations, sum(durations))
+            print(f"{study} trial {trial}: precision {np.mean(precisions) * 100:.2f}% "
+                  f"(+/- {np.std(precisions) * 100:.2f}), {int(np.median(iterations))} trees")
+
+    metrics.record_throughput('model_fits', fits, time.perf_counter() - search_started, study=study)
+    return store.best(study)
+
+
+def fit_final_model(X, y, params, n_estimators, seed=100, n_jobs=-1):
+    """Refit the selected configuration on every row with the early-stopped tree count"""
+    final_params = dict(BASE_PARAMS, **params, n_estimators=n_estimators, n_jobs=n_jobs)
+    model = lgb.LGBMClassifier(**final_params, random_state=seed)
+    model.fit(X, y)
+    return model
@@ -1,11 +1,36 @@
+import numpy as np
+from .expected_value import as_odds, scalar_result
+
+
+def american_to_decimals(american_odds, decimals=2):
+    """Net payout per unit staked for an array of American odds (NaN where missing)"""
+    american_odds = as_odds(american_odds)
+    with np.errstate(divide='ignore'):
+        decimal_odds = np.where(american_odds >= 100, american_odds / 100, 100 / np.abs(american_odds))
+    return decimal_odds if decimals is None else np.round(decimal_odds, decimals)
+
+
+def kelly_fractions(american_odds, model_prob, decimals=2):
+    """Kelly stake as a percentage of bankroll, floored at 0 (NaN where the line is missing)
+
+    Pass decimals=None to use unrounded odds and stakes.
+    """
+    model_prob = np.asarray(model_prob, dtype=float)
+    bankroll_fraction = _kelly_percent(american_to_decimals(american_odds, decimals), model_prob)
+    if decimals is not None:
+        bankroll_fraction = np.round(bankroll_fraction, decimals)
+    return np.maximum(bankroll_fraction, 0.0)
+
+
+def _kelly_percent(decimal_odds, model_prob):
+    return (100 * (decimal_odds * model_prob - (1 - model_prob))) / decimal_odds
+
+
 def american_to_decimal(american_odds):
-    if american_odds >= 100:
-        decimal_odds = (american_odds / 100)
-    else:
-        decimal_odds = (100 / abs(american_odds))
-    return round(decimal_odds, 2)
+    return round(scalar_result(american_to_decimals(american_odds, decimals=None), american_odds), 2)
+
 
 def calculate_kelly_criterion(american_odds, model_prob):
-    decimal_odds = american_to_decimal(american_odds)
-    bankroll_fraction = round((100 * (decimal_odds * model_prob - (1 - model_prob))) / decimal_odds, 2)
-    return bankroll_fraction if bankroll_fraction > 0 else 0
\ No newline at end of file
+    # Same operations and rounding order as kelly_fractions, on scalars so round() matches the original
+    bankroll_fraction = round(_kelly_percent(american_to_decimal(american_odds), model_prob), 2)
+    return bankroll_fraction if bankroll_fraction > 0 else 0
@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+import pandas as pd
+
+# Scoreboard per-book fields recorded for every game
+MARKETS = ['home_ml', 'away_ml', 'total', 'over_odds', 'under_odds',
+           'home_spread', 'home_spread_odds', 'away_spread', 'away_spread_odds']
+
+
+def game_key(game, at):
+    """Stable key of a scraped game: start date plus home and away team
+
+    Games without a start date take the local date of the poll time `at`, which is the
+    date the scoreboard was scraped for, so replaying a recorded poll gives the same key.
+    LineRecorder keeps that key while the game stays on the board past midnight.
+    """
+    start = str(game.get('date') or datetime.fromtimestamp(at).date())[:10]
+    return f"{start}:{game['home_team']}:{game['away_team']}"
+
+
+class ScoreboardSource:
+    """Live SBR Scoreboard polls, bypassing the response cache so every poll sees current lines"""
+    live = True
+
+    def __init__(self, sport='NBA'):
+        self.sport = sport
+
+    def poll(self):
+        from .tools import scrape_scoreboard
+        return time.time(), scrape_scoreboard(sport=self.sport)
+
+
+class FixtureSource:
+    """Replays recorded polls from a JSON-lines file of {"at": unix_seconds, "games": [...]} objects"""
+    live = False
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.polls = [json.loads(line) for line in f if line.strip()]
+        self.position = 0
+
+    def poll(self):
+        if self.position >= len(self.polls):
+            return None
+        snapshot = self.polls[self.position]
+        self.position += 1
+        return snapshot['at'], snapshot['games']
+
+
+class LineRecorder:
+    """Append-only store of line changes
+
+    Each (game, book, market) series is dictionary-encoded to an integer id and only values
+    that differ from the series' previous value are appended, as (series, second, value) rows
+    clustered on (series, second). A line that disappears from the board is stored as NULL.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS series (
+                id INTEGER PRIMARY KEY, game TEXT NOT NULL, book TEXT NOT NULL, market TEXT NOT NULL,
+                UNIQUE (game, book, market));
+            CREATE TABLE IF NOT EXISTS moves (
+                series INTEGER NOT NULL, at INTEGER NOT NULL, value REAL,
+                PRIMARY KEY (series, at)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS polls (at INTEGER PRIMARY KEY, games INTEGER NOT NULL, changes INTEGER NOT NULL);
+        ''')
+        self.series = {}
+        self.game_series = {}
+        for series_id, game, book, market in self.conn.execute('SELECT id, game, book, market FROM series'):
+            self.series[(game, book, market)] = series_id
+            self.game_series.setdefault(game, set()).add(series_id)
+        # Latest stored value of every series, so a poll only has to diff against memory
+        self.latest = dict(self.conn.execute(
+            'SELECT series, value FROM moves m WHERE at = (SELECT MAX(at) FROM moves WHERE series = m.series)'))
+        # Key of every game on the previous poll's board by (home, away), seeded with the games
+        # of the last recorded poll's date so a restart after midnight continues their series
+        self.board = {}
+        last_poll = self.conn.execute('SELECT MAX(at) FROM polls').fetchone()[0]
+        if last_poll is not None:
+            day = str(datetime.fromtimestamp(last_poll).date())
+            for game in self.game_series:
+                start, home, away = game.split(':')
+                if start == day:
+                    self.board[(home, away)] = game
+
+    def _series_id(self, key):
+        series_id = self.series.get(key)
+        if series_id is None:
+            series_id = self.conn.execute('INSERT INTO series (game, book, market) VALUES (?, ?, ?)', key).lastrowid
+            self.series[key] = series_id
+            self.game_series.setdefault(key[0], set()).add(series_id)
+        return series_id
+
+    def _game_key(self, game, at):
+        if not game.get('date'):
+            key = self.board.get((game['home_team'], game['away_team']))
+            if key is not None:
+                return key
+        return game_key(game, at)
+
+    def record(self, games, at=None):
+        """Append the lines of one poll that changed since the previous poll; returns the number of changes"""
+        at = int(at if at is not None else time.time())
+        seen = set()
+        changes = []
+        keys = [self._game_key(game, at) for game in games]
+        for game, key in zip(games, keys):
+            for market in MARKETS:
+                for book, value in (game.get(market) or {}).items():
+                    value = None if value is None else float(value)
+                    series_id = self._series_id((key, book, market))
+                    seen.add(series_id)
+                    if series_id not in self.latest or self.latest[series_id] != value:
+                        changes.append((series_id, at, value))
+
+        # Lines of games still on the board that a book pulled since the last poll
+        for key in set(keys):
+            for series_id in self.game_series[key] - seen:
+                if self.latest.get(series_id) is not None:
+                    changes.append((series_id, at, None))
+
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO moves VALUES (?, ?, ?)', changes)
+            self.conn.execute('INSERT OR REPLACE INTO polls VALUES (?, ?, ?)', (at, len(games), len(changes)))
+        for series_id, _, value in changes:
+            self.latest[series_id] = value
+        self.board = {(game['home_team'], game['away_team']): key for game, key in zip(games, keys)}
+        return len(changes)
+
+    def line_as_of(self, game, book, market, at):
+        """Value of one line at time `at` (unix seconds or datetime, naive meaning UTC), None when not yet
+        posted or pulled"""
+        series_id = self.series.get((game, book, market))
+        if series_id is None:
+            return None
+        row = self.conn.execute('SELECT value FROM moves WHERE series = ? AND at <= ? ORDER BY at DESC LIMIT 1',
+                                (series_id, _seconds(at))).fetchone()
+        return row[0] if row else None
+
+    def snapshot_as_of(self, at, game=None):
+        """Every line (optionally of one game) as it stood at time `at`, one row per game, book and market"""
+        query = ('SELECT s.game, s.book, s.market, '
+                 '(SELECT value FROM moves WHERE series = s.id AND at <= :at ORDER BY at DESC LIMIT 1) AS value, '
+                 '(SELECT MAX(at) FROM moves WHERE series = s.id AND at <= :at) AS changed_at '
+                 'FROM series s' + (' WHERE s.game = :game' if game is not None else ''))
+        snapshot = pd.read_sql(query, self.conn, params={'at': _seconds(at), 'game': game})
+        return snapshot[snapshot['changed_at'].notna()].reset_index(drop=True)
+
+    def history(self, game, book=None, market=None):
+        """Full movement history of a game's lines in time order, with UTC times"""
+        query = ('SELECT s.book, s.market, m.at, m.value FROM moves m JOIN series s ON s.id = m.series '
+                 'WHERE s.game = ?')
+        params = [game]
+        if book is not None:
+            query += ' AND s.book = ?'
+            params.append(book)
+        if market is not None:
+            query += ' AND s.market = ?'
+            params.append(market)
+        history = pd.read_sql(query + ' ORDER BY m.at, s.book, s.market', self.conn, params=params)
+        history['at'] = pd.to_datetime(history['at'], unit='s', utc=True)
+        return history
+
+    def close(self):
+        self.conn.close()
+
+
+def _seconds(at):
+    """Unix seconds of `at`; naive datetimes are UTC, like the ones pandas gives for stored times"""
+    if isinstance(at, (datetime, pd.Timestamp)):
+        at = pd.Timestamp(at)
+        if at.tzinfo is None:
+            at = at.tz_localize('UTC')
+        return int(at.timestamp())
+    return int(at)
+
+
+def run_recorder(source, recorder, interval=60, max_polls=None):
+    """Poll `source` every `interval` seconds (immediately for fixture feeds) and record the changes"""
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        started = time.monotonic()
+        snapshot = source.poll()
+        if snapshot is None:
+            break
+        at, games = snapshot
+        changes = recorder.record(games, at=at)
+        polls += 1
+        print(f"{datetime.fromtimestamp(at, timezone.utc):%Y-%m-%d %H:%M:%S} UTC {len(games)} games, "
+              f"{changes} line changes")
+        if source.live:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    return polls
@@ -0,0 +1,179 @@
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and latency histograms keyed by name and labels"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, labels=()):
+        with self.lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, labels=()):
+        with self.lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name, seconds, labels=()):
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0,
+                                                               'count': 0, 'max': 0.0}
+            histogram['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            histogram['max'] = max(histogram['max'], seconds)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                           for (name, labels), value in sorted(self.gauges.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': h['count'], 'sum': h['sum'],
+                                'mean': h['sum'] / h['count'] if h['count'] else 0.0, 'max': h['max'],
+                                'buckets': {str(bound): count for bound, count in zip(BUCKETS, h['buckets'])}}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+    def to_prometheus(self):
+        lines = []
+        data = self.to_dict()
+        for kind, entries in (('counter', data['counters']), ('gauge', data['gauges'])):
+            for name in dict.fromkeys(entry['name'] for entry in entries):
+                lines.append(f'# TYPE {name} {kind}')
+                lines += [f"{name}{_labels(entry['labels'])} {entry['value']}" for entry in entries if entry['name'] == name]
+        for name in dict.fromkeys(entry['name'] for entry in data['histograms']):
+            lines.append(f'# TYPE {name} histogram')
+            for entry in (entry for entry in data['histograms'] if entry['name'] == name):
+                cumulative = 0
+                for bound, count in entry['buckets'].items():
+                    cumulative += count
+                    le = '+Inf' if bound == 'inf' else bound
+                    lines.append(f"{name}_bucket{_labels(dict(entry['labels'], le=le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(entry['labels'])} {entry['sum']}")
+                lines.append(f"{name}_count{_labels(entry['labels'])} {entry['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+
+_registry = None
+
+
+def enable_metrics():
+    """Start collecting metrics for this process (no-op helpers until called)"""
+    global _registry
+    _registry = MetricsRegistry()
+    return _registry
+
+
+def get_metrics():
+    """Return the process-wide registry, or None when metrics are disabled"""
+    return _registry
+
+
+def inc(name, value=1, **labels):
+    if _registry is not None:
+        _registry.inc(name, value, tuple(sorted(labels.items())))
+
+
+def set_gauge(name, value, **labels):
+    if _registry is not None:
+        _registry.set_gauge(name, value, tuple(sorted(labels.items())))
+
+
+def observe(name, seconds, **labels):
+    if _registry is not None:
+        _registry.observe(name, seconds, tuple(sorted(labels.items())))
+
+
+@contextmanager
+def timer(name, **labels):
+    """Record the duration of the block in the `name` histogram"""
+    if _registry is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def record_throughput(name, items, seconds, **labels):
+    """Count `items` processed and set the `{name}_per_second` gauge"""
+    inc(f'{name}_total', items, **labels)
+    if seconds > 0:
+        set_gauge(f'{name}_per_second', items / seconds, **labels)
+
+
+def write_metrics(output_dir):
+    """Write metrics.json and metrics.prom (Prometheus text format) to `output_dir`"""
+    if _registry is None:
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'metrics.json'), 'w') as f:
+        json.dump(_registry.to_dict(), f, indent=2)
+    with open(os.path.join(output_dir, 'metrics.prom'), 'w') as f:
+        f.write(_registry.to_prometheus())
+    return output_dir
+
+
+@contextmanager
+def profile_stage(stage, output_dir, profiler=None):
+    """Time a pipeline stage and optionally capture a cProfile or pyinstrument profile of it"""
+    capture = None
+    if profiler == 'cprofile':
+        capture = cProfile.Profile()
+        capture.enable()
+    elif profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed, falling back to cProfile")
+            profiler, capture = 'cprofile', cProfile.Profile()
+            capture.enable()
+        else:
+            capture = Profiler()
+            capture.start()
+    try:
+        with timer('stage_seconds', stage=stage):
+            yield
+    finally:
+        if capture is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            if profiler == 'cprofile':
+                capture.disable()
+                capture.dump_stats(os.path.join(output_dir, f'{stage}.prof'))
+                summary = io.StringIO()
+                pstats.Stats(capture, stream=summary).sort_stats('cumulative').print_stats(15)
+                with open(os.path.join(output_dir, f'{stage}_top.txt'), 'w') as f:
+                    f.write(summary.getvalue())
+            else:
+                capture.stop()
+                with open(os.path.join(output_dir, f'{stage}.html'), 'w') as f:
+                    f.write(capture.output_html())
+            print(f"Profile of {stage} written to {output_dir}")
@@ -0,0 +1,172 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime
+import numpy as np
+import lightgbm as lgb
+
+REGISTRY_DIR = '../model'
+REGISTRY_FILE = 'registry.json'
+
+# Per-node training statistics; prediction never reads them and LightGBM's parser fills them with zeros
+TRAINING_ONLY_FIELDS = ('split_gain=', 'leaf_weight=', 'leaf_count=',
+                        'internal_value=', 'internal_weight=', 'internal_count=')
+
+_boosters = {}
+_lock = threading.Lock()
+
+
+class RegisteredModel:
+    """A registry booster with the predict_proba interface of the pickled classifiers"""
+
+    def __init__(self, booster, entry):
+        self.booster = booster
+        self.entry = entry
+
+    @property
+    def features(self):
+        return self.entry['features']
+
+    def predict_proba(self, X):
+        """Probabilities for an array in training column order, or a DataFrame whose columns
+        are selected by name in the recorded feature order"""
+        if hasattr(X, 'columns'):
+            missing = [name for name in self.features if name not in X.columns]
+            if missing:
+                raise ValueError(f"{self.entry['target']} model {self.entry['version']} needs "
+                                 f"features missing from the input: {', '.join(missing)}")
+            X = X[self.features]
+        X = np.asarray(X, dtype=float)
+        if X.shape[1] != self.booster.num_feature():
+            raise ValueError(f"{self.entry['target']} model {self.entry['version']} expects "
+                             f"{self.booster.num_feature()} features, got {X.shape[1]}")
+        p = self.booster.predict(X)
+        return np.column_stack([1 - p, p])
+
+
+def predict_proba(model, frame):
+    """Probabilities of a registry model or a legacy pickled classifier for a frame of named features"""
+    if isinstance(model, RegisteredModel):
+        return model.predict_proba(frame)
+    # The pickles were fitted on unnamed arrays in the frame's column order
+    return model.predict_proba(frame.to_numpy(dtype=float))
+
+
+def slim_model_string(model_str):
+    """LightGBM model text with only what prediction reads
+
+    Drops the per-node training statistics and the feature importance and parameter
+    sections (parameters are kept in the registry entry), and rewrites tree_sizes so the
+    trees are still parsed in parallel. Predictions are unchanged.
+    """
+    header, rest = model_str.split('\nTree=', 1)
+    trees = ('Tree=' + rest).split('end of trees', 1)[0]
+    blocks = []
+    for block in trees.split('\n\n\n'):
+        if block.strip():
+            lines = [line for line in block.split('\n') if not line.startswith(TRAINING_ONLY_FIELDS)]
+            blocks.append('\n'.join(lines) + '\n\n\n')
+    sizes = ' '.join(str(len(block.encode())) for block in blocks)
+    header = re.sub(r'^tree_sizes=.*$', f'tree_sizes={sizes}', header, flags=re.MULTILINE)
+    categorical = model_str[model_str.rfind('pandas_categorical:'):]
+    return f"{header}\n{''.join(blocks)}end of trees\n\n{categorical}"
+
+
+def read_registry(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, REGISTRY_FILE)
+    if not os.path.exists(path):
+        return {'models': {}, 'active': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_registry(registry_dir, registry):
+    tmp_path = os.path.join(registry_dir, REGISTRY_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(registry_dir, REGISTRY_FILE))
+
+
+def _entry(registry, target, version):
+    for entry in registry['models'].get(target, []):
+        if entry['version'] == version:
+            return entry
+    raise KeyError(f"No {target} model version {version} in the registry")
+
+
+def select_active(registry, target, metric='precision'):
+    """The pinned active entry of a target, else the registered entry with the best metric"""
+    version = registry['active'].get(target)
+    if version is not None:
+        return _entry(registry, target, version)
+    entries = registry['models'].get(target, [])
+    if not entries:
+        return None
+    return max(entries, key=lambda entry: (entry['metrics'].get(metric, float('-inf')), entry['trained_at']))
+
+
+def register_model(booster, target, features, dataset_hash, metrics, params,
+                   registry_dir=REGISTRY_DIR, promote='best', metric='precision'):
+    """Save a booster in LightGBM's text format (slimmed, uncompressed) and record it in the manifest
+
+    promote='best' activates it when its metric beats the active model, 'latest' always
+    activates it and 'none' only registers it.
+    """
+    registry = read_registry(registry_dir)
+    versions = {entry['version'] for entry in registry['models'].get(target, [])}
+    trained_at = datetime.now()
+    version = base = trained_at.strftime('%Y%m%dT%H%M%S')
+    suffix = 1
+    while version in versions:
+        version, suffix = f'{base}-{suffix}', suffix + 1
+    os.makedirs(os.path.join(registry_dir, target), exist_ok=True)
+    file_name = os.path.join(target, f'{version}.txt')
+    with open(os.path.join(registry_dir, file_name), 'w') as f:
+        f.write(slim_model_string(booster.model_to_string()))
+
+    entry = {
+        'target': target,
+        'version': version,
+        'file': file_name,
+        'features': list(features),
+        'num_trees': booster.num_trees(),
+        'dataset_hash': dataset_hash,
+        'metrics': metrics,
+        'params': params,
+        'trained_at': trained_at.isoformat(timespec='seconds'),
+    }
+    registry['models'].setdefault(target, []).append(entry)
+    current = registry['active'].get(target)
+    if promote == 'latest' or (promote == 'best' and current is None):
+        registry['active'][target] = version
+    elif promote == 'best':
+        best = _entry(registry, target, current)['metrics'].get(metric, float('-inf'))
+        if metrics.get(metric, float('-inf')) >= best:
+            registry['active'][target] = version
+    _write_registry(registry_dir, registry)
+    return entry
+
+
+def activate(target, version, registry_dir=REGISTRY_DIR):
+    """Pin a registered version as the active model of a target"""
+    registry = read_registry(registry_dir)
+    _entry(registry, target, version)
+    registry['active'][target] = version
+    _write_registry(registry_dir, registry)
+
+
+def load_active_model(target, registry_dir=REGISTRY_DIR):
+    """Active RegisteredModel of a target, or None; boosters are parsed once per file per process"""
+    entry = select_active(read_registry(registry_dir), target)
+    if entry is None:
+        return None
+    path = os.path.join(registry_dir, entry['file'])
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    with _lock:
+        booster = _boosters.get(key)
+        if booster is None:
+            with open(path) as f:
+                booster = lgb.Booster(model_str=f.read())
+            _boosters[key] = booster
+    return RegisteredModel(booster, entry)
@@ -0,0 +1,284 @@
+"""
+Record/replay stand-in for stats.nba.com, data.nba.com and the SBR Scoreboard
+
+Record mode stores every live response the pipeline receives in a cassette (SQLite).
+Replay mode serves a cassette over local HTTP, optionally injecting latency, server
+errors and 429 rate-limit responses, and the pipeline routes its requests (and its
+Scoreboard scrapes) there instead of the live services.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import requests
+
+SCOREBOARD_PATH = '/sbr/scoreboard'
+
+
+def request_key(url):
+    """Cassette key of a URL: host, path and sorted query, independent of scheme"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.netloc}{parts.path}" + (f"?{query}" if query else '')
+
+
+def scoreboard_key(sport, date):
+    """Same key the response cache uses for a Scoreboard scrape"""
+    return f"scoreboard:{sport}:{date}"
+
+
+class Cassette:
+    """Recorded responses keyed by request_key / scoreboard_key"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                          'key TEXT PRIMARY KEY, status INTEGER NOT NULL, content_type TEXT NOT NULL, '
+                          'body BLOB NOT NULL, recorded_at REAL NOT NULL)')
+        self.conn.commit()
+
+    def put(self, key, body, status=200, content_type='application/json'):
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                              (key, status, content_type, zlib.compress(body, 6), time.time()))
+            self.conn.commit()
+
+    def get(self, key):
+        """(status, content_type, body) for a key, or None when it was never recorded"""
+        with self.lock:
+            row = self.conn.execute('SELECT status, content_type, body FROM responses WHERE key = ?',
+                                    (key,)).fetchone()
+        return None if row is None else (row[0], row[1], zlib.decompress(row[2]))
+
+    def latest(self, prefix):
+        """Most recently recorded response whose key starts with `prefix`"""
+        with self.lock:
+            row = self.conn.execute('SELECT key FROM responses WHERE key >= ? AND key < ? '
+                                    'ORDER BY recorded_at DESC LIMIT 1', (prefix, prefix + '\uffff')).fetchone()
+        return None if row is None else self.get(row[0])
+
+    def import_cache(self, cache_path):
+        """Copy every response of a response cache database (data/cache/responses.db) into the cassette"""
+        source = sqlite3.connect(cache_path)
+        count = 0
+        for key, payload in source.execute('SELECT key, payload FROM responses'):
+            self.put(key if key.startswith('scoreboard:') else request_key(key), zlib.decompress(payload))
+            count += 1
+        source.close()
+        return count
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class FaultProfile:
+    """Injected latency, server errors and rate limiting
+
+    Whether a request fails is drawn from an RNG seeded with (seed, key, n) where n counts
+    earlier requests for the same key, so a run is reproducible however requests interleave.
+    `max_rps` additionally answers 429 whenever the server-wide request rate exceeds it.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0, max_rps=0,
+                 retry_after=1, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.seen = Counter()
+        self.tokens = float(max_rps)
+        self.updated = time.monotonic()
+
+    @classmethod
+    def from_config(cls, settings):
+        return cls(latency_ms=settings.get('latency-ms', 0), jitter_ms=settings.get('jitter-ms', 0),
+                   error_rate=settings.get('error-rate', 0.0), throttle_rate=settings.get('throttle-rate', 0.0),
+                   max_rps=settings.get('max-rps', 0), retry_after=settings.get('retry-after', 1),
+                   seed=settings.get('seed', 0))
+
+    def _over_rate(self):
+        if not self.max_rps:
+            return False
+        now = time.monotonic()
+        self.tokens = min(float(self.max_rps), self.tokens + (now - self.updated) * self.max_rps)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return False
+        return True
+
+    def decide(self, key):
+        """Return (delay seconds, injected status or None) for one request"""
+        with self.lock:
+            n = self.seen[key]
+            self.seen[key] += 1
+            over_rate = self._over_rate()
+        rng = random.Random(f"{self.seed}:{key}:{n}")
+        delay = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        draw = rng.random()
+        if over_rate or draw < self.throttle_rate:
+            return delay, 429
+        if draw < self.throttle_rate + self.error_rate:
+            return delay, 503
+        return delay, None
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves GET /{host}{path}?{query} and /sbr/scoreboard?sport=&date= from the cassette"""
+    cassette = None
+    faults = None
+    stats = None
+    stats_lock = None
+
+    def _count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def do_GET(self):
+        if self.path == '/_replay/stats':
+            with self.stats_lock:
+                return self._send(200, 'application/json', json.dumps(dict(self.stats)).encode())
+
+        parts = urlsplit(self.path)
+        if parts.path == SCOREBOARD_PATH:
+            query = dict(parse_qsl(parts.query))
+            sport = query.get('sport', 'NBA')
+            # Without a date ("today") the latest recorded scrape of the sport stands in
+            key = scoreboard_key(sport, query['date']) if query.get('date') else scoreboard_key(sport, '')
+            lookup = (lambda: self.cassette.get(key)) if query.get('date') else (lambda: self.cassette.latest(key))
+        else:
+            key = request_key('//' + self.path.lstrip('/'))
+            lookup = lambda: self.cassette.get(key)
+
+        delay, status = self.faults.decide(key)
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            self._count('throttled')
+            return self._send(429, 'application/json', b'{"error": "rate limited"}',
+                              {'Retry-After': str(self.faults.retry_after)})
+        if status is not None:
+            self._count('errors')
+            return self._send(status, 'application/json', b'{"error": "injected failure"}')
+
+        recorded = lookup()
+        if recorded is None:
+            self._count('missing')
+            return self._send(404, 'application/json', json.dumps({'error': f'Not recorded: {key}'}).encode())
+        self._count('served')
+        self._send(*recorded)
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(cassette, faults=None, host='127.0.0.1', port=0):
+    """Serve a cassette from a background thread; returns the server (its port in server_address)"""
+    handler = type('Handler', (ReplayHandler,), {
+        'cassette': cassette, 'faults': faults or FaultProfile(), 'stats': Counter(), 'stats_lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_replay(settings):
+    """Run the replay server from a [replay] config section until interrupted"""
+    cassette = Cassette(settings.get('cassette', '../data/replay/cassette.db'))
+    if settings.get('import-cache'):
+        print(f"Imported {cassette.import_cache(settings['import-cache'])} cached responses")
+    host, port = settings.get('host', '127.0.0.1'), settings.get('port', 8766)
+    server = start_replay_server(cassette, FaultProfile.from_config(settings), host, port)
+    print(f"Replaying {len(cassette)} recorded responses on http://{host}:{port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"Replay stats: {dict(server.RequestHandlerClass.stats)}")
+        cassette.close()
+
+
+class ReplayScoreboard:
+    """Drop-in for sbrscrape.Scoreboard reading games from the replay server
+
+    Like Scoreboard, a failed request leaves `games` empty instead of raising.
+    """
+
+    def __init__(self, base_url, sport='NBA', date=None, timeout=30):
+        self.games = []
+        params = {'sport': sport}
+        if date:
+            params['date'] = str(date)
+        try:
+            response = requests.get(f"{base_url}{SCOREBOARD_PATH}", params=params, timeout=timeout)
+            if response.status_code == 200:
+                self.games = response.json()
+        except (requests.RequestException, ValueError):
+            pass
+
+
+_replay_url = None
+_cassette = None
+
+
+def configure_replay(base_url=None, record_path=None):
+    """Route requests to a replay server and/or record live responses into a cassette"""
+    global _replay_url, _cassette
+    _replay_url = base_url.rstrip('/') if base_url else None
+    if _cassette is not None:
+        _cassette.close()
+    _cassette = None
+    if record_path:
+        _cassette = Cassette(record_path)
+
+
+def get_replay_url():
+    """Base URL of the replay server, or None when requests go to the live services"""
+    return _replay_url
+
+
+def replay_url(url):
+    """The URL to request: unchanged live, rewritten onto the replay server in replay mode"""
+    if _replay_url is None:
+        return url
+    return f"{_replay_url}/{request_key(url)}"
+
+
+def record_response(key, body, content_type='application/json'):
+    """Store a live response in the cassette when recording (`key` is a URL or a scoreboard_key)"""
+    if _cassette is None:
+        return
+    if not key.startswith('scoreboard:'):
+        key = request_key(key)
+    _cassette.put(key, body, content_type=content_type)
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from .watermarks import is_final
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a response is not in the cache"""
+
+
+class ResponseCache:
+    """SQLite-backed cache of compressed raw responses
+
+    Responses for dates the collection log treats as final (more than `mutable_days`
+    days in the past) never expire; responses for more recent dates are kept for `ttl`
+    seconds, so a date that is refetched while still mutable does not get stale data. Once the stored payloads exceed `max_bytes`, the least recently
+    used entries are evicted. In offline mode every miss raises CacheMiss.
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl=900, offline=False, mutable_days=1):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.offline = offline
+        self.mutable_days = mutable_days
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                          'key TEXT PRIMARY KEY, payload BLOB NOT NULL, size INTEGER NOT NULL, '
+                          'expires_at REAL, last_access REAL NOT NULL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)')
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached payload bytes for a key, or None when missing or expired"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute('SELECT payload, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and (row[1] is None or row[1] > now or self.offline):
+                self.conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                self.conn.commit()
+                return zlib.decompress(row[0])
+        if self.offline:
+            raise CacheMiss(key)
+        return None
+
+    def put(self, key, payload, as_of=None):
+        """Store payload bytes; `as_of` is the date the response describes (None means mutable)"""
+        now = time.time()
+        expires_at = None if as_of is not None and is_final(as_of, self.mutable_days) else now + self.ttl
+        compressed = zlib.compress(payload, 6)
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                              (key, compressed, len(compressed), expires_at, now))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_cache = None
+
+
+def configure_cache(settings, offline=None, mutable_days=1):
+    """Set up the process-wide cache from a [cache] config section
+
+    `mutable_days` is [collection] mutable-days, so the cache and the collection log agree
+    on when a date's data is final.
+    """
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+    if offline is None:
+        offline = settings.get('offline', False)
+    if settings.get('enabled', True) or offline:
+        _cache = ResponseCache(
+            settings.get('path', '../data/cache/responses.db'),
+            max_bytes=int(settings.get('max-size-mb', 512) * 1024 * 1024),
+            ttl=settings.get('ttl', 900),
+            offline=offline,
+            mutable_days=mutable_days,
+        )
+    return _cache
+
+
+def get_cache():
+    """Return the process-wide cache, or None when caching is not configured"""
+    return _cache
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pandas as pd
+from .franchises import franchise_id, franchise_ids, UNKNOWN
+
+SCHEDULE_PATH = '../data/csv/nba-2024-UTC.csv'
+DEFAULT_REST_DAYS = 7
+
+_indexes = {}
+
+
+def _index_cache_path(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'schedule_{name}.npz')
+
+
+def build_schedule_index(path):
+    """Map each team to the sorted datetime64 array of its scheduled games"""
+    schedule = pd.read_csv(path, parse_dates=['Date'], date_format='%d/%m/%Y %H:%M')
+    games = pd.concat([
+        schedule[['Home Team', 'Date']].set_axis(['Team', 'Date'], axis=1),
+        schedule[['Away Team', 'Date']].set_axis(['Team', 'Date'], axis=1),
+    ]).sort_values(['Team', 'Date'], kind='stable')
+    dates = games['Date'].to_numpy().astype('datetime64[m]')
+    teams, starts = np.unique(games['Team'].to_numpy(), return_index=True)
+    return dict(zip(teams, np.split(dates, starts[1:])))
+
+
+def load_schedule_index(path=SCHEDULE_PATH, cache_dir='../data/cache'):
+    """Schedule index for `path`, cached in memory and on disk until the CSV's mtime changes"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    key = (os.path.abspath(path), mtime_ns)
+    if key in _indexes:
+        return _indexes[key]
+
+    index = None
+    cache_path = _index_cache_path(path, cache_dir) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if int(cached['mtime_ns']) == mtime_ns:
+                index = dict(zip(cached['teams'], np.split(cached['dates'], cached['starts'][1:])))
+
+    if index is None:
+        index = build_schedule_index(path)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            teams = np.array(list(index))
+            lengths = [len(index[team]) for team in teams]
+            np.savez(cache_path, mtime_ns=mtime_ns, teams=teams,
+                     dates=np.concatenate(list(index.values())),
+                     starts=np.concatenate([[0], np.cumsum(lengths)[:-1]]))
+
+    _indexes[key] = index
+    return index
+
+
+def last_game_before(index, team, when):
+    """Latest scheduled game of `team` at or before `when`, or None"""
+    dates = index.get(team)
+    if dates is None:
+        # The schedule may spell the team differently ("LA Clippers" / "Los Angeles Clippers")
+        franchise = franchise_id(team)
+        teams = list(index)
+        same_franchise = np.flatnonzero(franchise_ids(teams) == franchise)
+        if franchise == UNKNOWN or not len(same_franchise):
+            return None
+        dates = index[teams[same_franchise[0]]]
+    position = np.searchsorted(dates, np.datetime64(when, 'm'), side='right')
+    return dates[position - 1] if position > 0 else None
+
+
+def rest_days(index, teams, when):
+    """Whole days since each team's previous game plus one, DEFAULT_REST_DAYS without one"""
+    when = np.datetime64(when, 'us')
+    days = []
+    for team in teams:
+        last_game = last_game_before(index, team, when)
+        if last_game is None:
+            days.append(DEFAULT_REST_DAYS)
+        else:
+            days.append(int((when + np.timedelta64(1, 'D') - last_game) // np.timedelta64(1, 'D')))
+    return np.array(days, dtype=int)
@@ -1,199 +0,0 @@
-team_code = {
-    'Atlanta': 'Atlanta Hawks',
-    'NewJersey': 'New Jersey Nets',
-    'Boston': 'Boston Celtics',
-    'Brooklyn': 'Brooklyn Nets',
-    'Charlotte': 'Charlotte Bobcats',
-    'Chicago': 'Chicago Bulls',
-    'Cleveland': 'Cleveland Cavaliers',
-    'Dallas': 'Dallas Mavericks',
-    'Denver': 'Denver Nuggets',
-    'Detroit': 'Detroit Pistons',
-    'GoldenState': 'Golden State Warriors',
-    'Houston': 'Houston Rockets',
-    'Indiana': 'Indiana Pacers',
-    'LA Clippers': 'Los Angeles Clippers',
-    'LA Lakers': 'Los Angeles Lakers',
-    'Memphis': 'Memphis Grizzlies',
-    'Miami': 'Miami Heat',
-    'Milwaukee': 'Milwaukee Bucks',
-    'Minnesota': 'Minnesota Timberwolves',
-    'NewOrleans': 'New Orleans Pelicans',
-    'NewYork': 'New York Knicks',
-    'OklahomaCity': 'Oklahoma City Thunder',
-    'Orlando': 'Orlando Magic',
-    'Philadelphia': 'Philadelphia 76ers',
-    'Phoenix': 'Phoenix Suns',
-    'Portland': 'Portland Trail Blazers',
-    'Sacramento': 'Sacramento Kings',
-    'SanAntonio': 'San Antonio Spurs',
-    'Toronto': 'Toronto Raptors',
-    'Utah': 'Utah Jazz',
-    'Washington': 'Washington Wizards',
-}
-
-team_index_10 = {
-    'Atlanta Hawks': 0,
-    'Boston Celtics': 1,
-    'Charlotte Bobcats': 2,
-    'Chicago Bulls': 3,
-    'Cleveland Cavaliers': 4,
-    'Dallas Mavericks': 5,
-    'Denver Nuggets': 6,
-    'Detroit Pistons': 7,
-    'Golden State Warriors': 8,
-    'Houston Rockets': 9,
-    'Indiana Pacers': 10,
-    'Los Angeles Clippers': 11,
-    'Los Angeles Lakers': 12,
-    'Memphis Grizzlies': 13,
-    'Miami Heat': 14,
-    'Milwaukee Bucks': 15,
-    'Minnesota Timberwolves': 16,
-    'New Jersey Nets': 17,
-    'New Orleans Pelicans': 18,
-    'New York Knicks': 19,
-    'Oklahoma City Thunder': 20,
-    'Orlando Magic': 21,
-    'Philadelphia 76ers': 22,
-    'Phoenix Suns': 23,
-    'Portland Trail Blazers': 24,
-    'Sacramento Kings': 25,
-    'San Antonio Spurs': 26,
-    'Toronto Raptors': 27,
-    'Utah Jazz': 28,
-    'Washington Wizards': 29
-}
-
-team_index_12 = {
-    'Atlanta Hawks': 0,
-    'Boston Celtics': 1,
-    'Brooklyn Nets': 2,
-    'Charlotte Bobcats': 3,
-    'Chicago Bulls': 4,
-    'Cleveland Cavaliers': 5,
-    'Dallas Mavericks': 6,
-    'Denver Nuggets': 7,
-    'Detroit Pistons': 8,
-    'Golden State Warriors': 9,
-    'Houston Rockets': 10,
-    'Indiana Pacers': 11,
-    'Los Angeles Clippers': 12,
-    'Los Angeles Lakers': 13,
-    'Memphis Grizzlies': 14,
-    'Miami Heat': 15,
-    'Milwaukee Bucks': 16,
-    'Minnesota Timberwolves': 17,
-    'New Orleans Pelicans': 18,
-    'New York Knicks': 19,
-    'Oklahoma City Thunder': 20,
-    'Orlando Magic': 21,
-    'Philadelphia 76ers': 22,
-    'Phoenix Suns': 23,
-    'Portland Trail Blazers': 24,
-    'Sacramento Kings': 25,
-    'San Antonio Spurs': 26,
-    'Toronto Raptors': 27,
-    'Utah Jazz': 28,
-    'Washington Wizards': 29
-}
-
-team_index_13 = {
-    'Atlanta Hawks': 0,
-    'Boston Celtics': 1,
-    'Brooklyn Nets': 2,
-    'Charlotte Bobcats': 3,
-    'Chicago Bulls': 4,
-    'Cleveland Cavaliers': 5,
-    'Dallas Mavericks': 6,
-    'Denver Nuggets': 7,
-    'Detroit Pistons': 8,
-    'Golden State Warriors': 9,
-    'Houston Rockets': 10,
-    'Indiana Pacers': 11,
-    'Los Angeles Clippers': 12,
-    'Los Angeles Lakers': 13,
-    'Memphis Grizzlies': 14,
-    'Miami Heat': 15,
-    'Milwaukee Bucks': 16,
-    'Minnesota Timberwolves': 17,
-    'New Orleans Pelicans': 18,
-    'New York Knicks': 19,
-    'Oklahoma City Thunder': 20,
-    'Orlando Magic': 21,
-    'Philadelphia 76ers': 22,
-    'Phoenix Suns': 23,
-    'Portland Trail Blazers': 24,
-    'Sacramento Kings': 25,
-    'San Antonio Spurs': 26,
-    'Toronto Raptors': 27,
-    'Utah Jazz': 28,
-    'Washington Wizards': 29
-}
-
-team_index_14 = {
-    'Atlanta Hawks': 0,
-    'Boston Celtics': 1,
-    'Brooklyn Nets': 2,
-    'Charlotte Bobcats': 3,
-    'Chicago Bulls': 4,
-    'Cleveland Cavaliers': 5,
-    'Dallas Mavericks': 6,
-    'Denver Nuggets': 7,
-    'Detroit Pistons': 8,
-    'Golden State Warriors': 9,
-    'Houston Rockets': 10,
-    'Indiana Pacers': 11,
-    'Los Angeles Clippers': 12,
-    'Los Angeles Lakers': 13,
-    'Memphis Grizzlies': 14,
-    'Miami Heat': 15,
-    'Milwaukee Bucks': 16,
-    'Minnesota Timberwolves': 17,
-    'New Orleans Pelicans': 18,
-    'New York Knicks': 19,
-    'Oklahoma City Thunder': 20,
-    'Orlando Magic': 21,
-    'Philadelphia 76ers': 22,
-    'Phoenix Suns': 23,
-    'Portland Trail Blazers': 24,
-    'Sacramento Kings': 25,
-    'San Antonio Spurs': 26,
-    'Toronto Raptors': 27,
-    'Utah Jazz': 28,
-    'Washington Wizards': 29
-}
-
-team_index_current = {
-    'Atlanta Hawks': 0,
-    'Boston Celtics': 1,
-    'Brooklyn Nets': 2,
-    'Charlotte Hornets': 3,
-    'Chicago Bulls': 4,
-    'Cleveland Cavaliers': 5,
-    'Dallas Mavericks': 6,
-    'Denver Nuggets': 7,
-    'Detroit Pistons': 8,
-    'Golden State Warriors': 9,
-    'Houston Rockets': 10,
-    'Indiana Pacers': 11,
-    'Los Angeles Clippers': 12,
-    'LA Clippers': 12,
-    'Los Angeles Lakers': 13,
-    'Memphis Grizzlies': 14,
-    'Miami Heat': 15,
-    'Milwaukee Bucks': 16,
-    'Minnesota Timberwolves': 17,
-    'New Orleans Pelicans': 18,
-    'New York Knicks': 19,
-    'Oklahoma City Thunder': 20,
-    'Orlando Magic': 21,
-    'Philadelphia 76ers': 22,
-    'Phoenix Suns': 23,
-    'Portland Trail Blazers': 24,
-    'Sacramento Kings': 25,
-    'San Antonio Spurs': 26,
-    'Toronto Raptors': 27,
-    'Utah Jazz': 28,
-    'Washington Wizards': 29
-}
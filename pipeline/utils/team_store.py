@@ -0,0 +1,213 @@
+import hashlib
+import re
+from datetime import datetime
+import pandas as pd
+
+TEAM_STATS_TABLE = 'team_stats'
+DIGEST_TABLE = 'snapshot_digests'
+KEY_COLUMNS = ['Date', 'Season', 'index']
+TEXT_COLUMNS = {'TEAM_NAME'}
+INTEGER_COLUMNS = {'TEAM_ID'}
+DATE_TABLE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+SEASON_SECTIONS = ('fetch-data', 'create-game', 'fetch-odd-data')
+
+
+def team_storage_mode(config):
+    """Return the configured TeamData.db layout: 'per-date' (legacy) or 'long'"""
+    return config.get('team-data', {}).get('storage', 'per-date')
+
+
+def season_for_date(config, date):
+    """Find the season key whose configured date range contains the date"""
+    date = pd.Timestamp(date).date()
+    for section in SEASON_SECTIONS:
+        for season_key, season_value in config.get(section, {}).items():
+            start = datetime.strptime(season_value['start_date'], "%Y-%m-%d").date()
+            end = datetime.strptime(season_value['end_date'], "%Y-%m-%d").date()
+            if start <= date <= end:
+                return season_key
+
+    # Seasons start in October, anything before August belongs to the previous one
+    start_year = date.year if date.month > 8 else date.year - 1
+    return f"{start_year}-{str(start_year + 1)[2:]}"
+
+
+def seasons_for_dates(config, dates):
+    """Vectorized season_for_date over an array of dates"""
+    dates = pd.to_datetime(pd.Series(dates).astype(str).str[:10])
+    seasons = pd.Series([None] * len(dates), index=dates.index, dtype=object)
+    for section in reversed(SEASON_SECTIONS):
+        for season_key, season_value in config.get(section, {}).items():
+            in_range = dates.between(pd.Timestamp(season_value['start_date']), pd.Timestamp(season_value['end_date']))
+            seasons[in_range.to_numpy()] = season_key
+    missing = seasons.isna().to_numpy()
+    if missing.any():
+        seasons[missing] = [season_for_date(config, date) for date in dates[missing]]
+    return seasons.to_numpy()
+
+
+def _column_type(column):
+    if column in TEXT_COLUMNS:
+        return 'TEXT'
+    if column in INTEGER_COLUMNS:
+        return 'INTEGER'
+    return 'REAL'
+
+
+def ensure_team_stats_table(conn, columns):
+    """Create the long team_stats table, adding any stat columns it does not have yet"""
+    stat_columns = [col for col in columns if col not in KEY_COLUMNS]
+    column_defs = ['"Date" TEXT NOT NULL', '"Season" TEXT NOT NULL', '"index" INTEGER NOT NULL']
+    column_defs += [f'"{col}" {_column_type(col)}' for col in stat_columns]
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{TEAM_STATS_TABLE}" ({", ".join(column_defs)})')
+
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{TEAM_STATS_TABLE}")')}
+    for col in stat_columns:
+        if col not in existing:
+            conn.execute(f'ALTER TABLE "{TEAM_STATS_TABLE}" ADD COLUMN "{col}" {_column_type(col)}')
+
+    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{TEAM_STATS_TABLE}_date_team" '
+                 f'ON "{TEAM_STATS_TABLE}" ("Date", "TEAM_ID")')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{TEAM_STATS_TABLE}_season" '
+                 f'ON "{TEAM_STATS_TABLE}" ("Season", "Date")')
+
+
+def write_team_snapshot(conn, data, date, season):
+    """Replace the snapshot rows stored for one date, keeping the API row order in 'index'"""
+    data = data.drop(columns=[col for col in KEY_COLUMNS if col in data.columns])
+    ensure_team_stats_table(conn, data.columns)
+
+    columns = KEY_COLUMNS + list(data.columns)
+    rows = [
+        (str(date), season, position, *values)
+        for position, values in enumerate(data.itertuples(index=False, name=None))
+    ]
+    placeholders = ', '.join('?' for _ in columns)
+    quoted = ', '.join(f'"{col}"' for col in columns)
+
+    conn.execute(f'DELETE FROM "{TEAM_STATS_TABLE}" WHERE "Date" = ?', (str(date),))
+    conn.executemany(f'INSERT INTO "{TEAM_STATS_TABLE}" ({quoted}) VALUES ({placeholders})', rows)
+    update_snapshot_digest(conn, 'long', date)
+
+
+def read_team_snapshots(conn, season=None, start_date=None, end_date=None):
+    """Load every snapshot row for a season and/or date range with one query"""
+    clauses = []
+    params = []
+    if season is not None:
+        clauses.append('"Season" = ?')
+        params.append(season)
+    if start_date is not None:
+        clauses.append('"Date" >= ?')
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append('"Date" <= ?')
+        params.append(str(end_date))
+
+    where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+    return pd.read_sql_query(
+        f'SELECT * FROM "{TEAM_STATS_TABLE}"{where} ORDER BY "Date", "index"', conn, params=params
+    )
+
+
+def read_snapshot(conn, storage, date):
+    """Load the stored rows of one date's snapshot in API order, or None when there is none"""
+    if storage == 'long':
+        if not has_team_stats_table(conn):
+            return None
+        rows = read_team_snapshots(conn, start_date=date, end_date=date)
+        return rows if len(rows) else None
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (str(date),)).fetchone():
+        return None
+    return pd.read_sql_query(f'SELECT * FROM "{date}"', conn, index_col='index').sort_index()
+
+
+def snapshot_digest(rows):
+    """Content hash of a stored snapshot, ignoring the Date/Season/index bookkeeping columns"""
+    rows = rows.drop(columns=[col for col in KEY_COLUMNS if col in rows.columns]).reset_index(drop=True)
+    digest = hashlib.sha256('\x1f'.join(rows.columns).encode())
+    digest.update(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def ensure_digest_table(conn):
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{DIGEST_TABLE}" ("Date" TEXT PRIMARY KEY, digest TEXT NOT NULL)')
+
+
+def update_snapshot_digest(conn, storage, date):
+    """Re-hash one date's snapshot as stored; the caller commits together with the data"""
+    ensure_digest_table(conn)
+    rows = read_snapshot(conn, storage, str(date))
+    if rows is None:
+        conn.execute(f'DELETE FROM "{DIGEST_TABLE}" WHERE "Date" = ?', (str(date),))
+    else:
+        conn.execute(f'INSERT OR REPLACE INTO "{DIGEST_TABLE}" VALUES (?, ?)', (str(date), snapshot_digest(rows)))
+
+
+def snapshot_digests(conn, storage, dates):
+    """Return {date: digest} for the dates that have a snapshot
+
+    Digests are kept up to date by the writers, so this normally reads one small table;
+    snapshots written before digests existed are hashed once and their digest stored.
+    """
+    ensure_digest_table(conn)
+    dates = sorted({str(date) for date in dates})
+    if not dates:
+        return {}
+    digests = dict(conn.execute(f'SELECT "Date", digest FROM "{DIGEST_TABLE}" WHERE "Date" BETWEEN ? AND ?',
+                                (dates[0], dates[-1])))
+    missing = [date for date in dates if date not in digests]
+    if not missing:
+        return {date: digests[date] for date in dates}
+
+    if storage == 'long' and has_team_stats_table(conn):
+        rows = read_team_snapshots(conn, start_date=missing[0], end_date=missing[-1])
+        wanted = set(missing)
+        backfill = {date: snapshot_digest(group) for date, group in rows.groupby('Date', sort=False)
+                    if date in wanted}
+    else:
+        backfill = {}
+        for date in missing:
+            rows = read_snapshot(conn, storage, date)
+            if rows is not None:
+                backfill[date] = snapshot_digest(rows)
+    conn.executemany(f'INSERT OR REPLACE INTO "{DIGEST_TABLE}" VALUES (?, ?)', list(backfill.items()))
+    conn.commit()
+    digests.update(backfill)
+    return {date: digests[date] for date in dates if date in digests}
+
+
+def has_team_stats_table(conn):
+    """Check whether the long team_stats table exists"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                       (TEAM_STATS_TABLE,)).fetchone()
+    return row is not None
+
+
+def list_per_date_tables(conn):
+    """List the legacy one-table-per-day snapshot tables"""
+    names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return sorted(name for name in names if DATE_TABLE_PATTERN.match(name))
+
+
+def stored_snapshot_dates(conn):
+    """Return every date that has a snapshot in either TeamData.db layout"""
+    dates = set(list_per_date_tables(conn))
+    if has_team_stats_table(conn):
+        dates.update(row[0] for row in conn.execute(f'SELECT DISTINCT "Date" FROM "{TEAM_STATS_TABLE}"'))
+    return dates
+
+
+def migrate_per_date_tables(conn, config, drop_tables=False):
+    """Copy legacy per-date snapshot tables into team_stats, optionally dropping them afterwards"""
+    migrated = set()
+    if has_team_stats_table(conn):
+        migrated = {row[0] for row in conn.execute(f'SELECT DISTINCT "Date" FROM "{TEAM_STATS_TABLE}"')}
+    tables = [table for table in list_per_date_tables(conn) if table not in migrated]
+    for table in tables:
+        data = pd.read_sql_query(f'SELECT * FROM "{table}"', conn, index_col='index')
+        write_team_snapshot(conn, data.sort_index(), table, season_for_date(config, table))
+        if drop_tables:
+            conn.execute(f'DROP TABLE "{table}"')
+    conn.commit()
+    return len(tables)
@@ -1,19 +1,25 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from pipeline.utils.team_code_index import team_index_current
+from datetime import datetime
+from pipeline.utils.franchises import franchise_id, franchise_ids, franchise_rows, UNKNOWN
+from pipeline.utils.schedule_index import load_schedule_index, rest_days
 
 def create_today_game(games, df, odds):
-    match_data = []
+    """Feature rows of today's games; the last value is the (home, away) pairs actually kept,
+    since games whose teams have no stats row are skipped"""
+    home_teams = []
+    away_teams = []
     today_game_uo = []
     home_team_odds = []
     away_team_odds = []
-    home_rest = []
-    away_rest = []
+    # Stats row of every franchise, plus a trailing UNKNOWN read by unknown names (ID -1)
+    rows = np.append(franchise_rows(df['TEAM_NAME'].to_numpy()), UNKNOWN)
 
     for game in games:
         home_team = game[0]
         away_team = game[1]
-        if home_team not in team_index_current or away_team not in team_index_current:
+        if rows[franchise_id(home_team)] == UNKNOWN or rows[franchise_id(away_team)] == UNKNOWN:
+            print(f"No team stats for {home_team} vs {away_team}, skipping")
             continue
         if odds is not None:
             game_odds = odds[home_team + ':' + away_team]
@@ -28,36 +34,22 @@ def create_today_game(games, df, odds):
             home_team_odds.append(input(home_team + ' odds: '))
             away_team_odds.append(input(away_team + ' odds: '))
 
-        schedule_df = pd.read_csv('../data/csv/nba-2024-UTC.csv',
-                                  parse_dates=['Date'], date_format='%d/%m/%Y %H:%M')
-        home_games = schedule_df[(schedule_df['Home Team'] == home_team) | (schedule_df['Away Team'] == home_team)]
-        away_games = schedule_df[(schedule_df['Home Team'] == away_team) | (schedule_df['Away Team'] == away_team)]
-        previous_home_games = \
-        home_games.loc[schedule_df['Date'] <= datetime.today()].sort_values('Date', ascending=False).head(1)['Date']
-        previous_away_games = \
-        away_games.loc[schedule_df['Date'] <= datetime.today()].sort_values('Date', ascending=False).head(1)['Date']
-        if len(previous_home_games) > 0:
-            last_home_date = previous_home_games.iloc[0]
-            home_days_off = timedelta(days=1) + datetime.today() - last_home_date
-        else:
-            home_days_off = timedelta(days=7)
-        if len(previous_away_games) > 0:
-            last_away_date = previous_away_games.iloc[0]
-            away_days_off = timedelta(days=1) + datetime.today() - last_away_date
-        else:
-            away_days_off = timedelta(days=7)
-        home_rest.append(home_days_off.days)
-        away_rest.append(away_days_off.days)
-        home_team_series = df.iloc[team_index_current.get(home_team)]
-        away_team_series = df.iloc[team_index_current.get(away_team)]
-        stats = pd.concat([home_team_series, away_team_series])
-        stats['Days-Rest-Home'] = home_days_off.days
-        stats['Days-Rest-Away'] = away_days_off.days
-        match_data.append(stats)
-    games_data_frame = pd.concat(match_data, ignore_index=True, axis=1)
-    games_data_frame = games_data_frame.T
-    frame_ml = games_data_frame.drop(columns=['TEAM_ID', 'TEAM_NAME'])
+        home_teams.append(home_team)
+        away_teams.append(away_team)
+
+    # Schedule parsed once per run (and cached on disk), previous games found by binary search
+    schedule = load_schedule_index()
+    now = datetime.today()
+
+    # One gather per side, rows located by franchise so the response's row order does not matter
+    home_stats = df.iloc[rows[franchise_ids(home_teams)]].reset_index(drop=True)
+    # Away columns get the '.1' suffix they have in Dataset.db, so models can select features by name
+    away_stats = df.iloc[rows[franchise_ids(away_teams)]].reset_index(drop=True).add_suffix('.1')
+    games_data_frame = pd.concat([home_stats, away_stats], axis=1)
+    games_data_frame['Days-Rest-Home'] = rest_days(schedule, home_teams, now)
+    games_data_frame['Days-Rest-Away'] = rest_days(schedule, away_teams, now)
+    frame_ml = games_data_frame.drop(columns=['TEAM_ID', 'TEAM_NAME', 'TEAM_ID.1', 'TEAM_NAME.1'])
     data = frame_ml.values
     data = data.astype(float)
 
-    return data, today_game_uo, frame_ml, home_team_odds, away_team_odds
+    return data, today_game_uo, frame_ml, home_team_odds, away_team_odds, list(zip(home_teams, away_teams))
@@ -1,8 +1,18 @@
-from sbrscrape import Scoreboard
+from .tools import fetch_scoreboard_games
+from .book_odds import book_odds_arrays, summarize_books, summary_to_odds
+
+
+def get_all_book_odds(sport='NBA'):
+    """Every book's money lines and totals from a single scrape, plus best lines, consensus and arbitrage"""
+    book_odds = book_odds_arrays(fetch_scoreboard_games(sport=sport))
+    return book_odds, summarize_books(book_odds)
+
 
 def get_sbr_odds(sport='NBA', sportsbook='fanduel'):
-    sb = Scoreboard(sport=sport)
-    games = sb.games if hasattr(sb, 'games') else []
+    if sportsbook == 'all':
+        # Best available money line across books, consensus total
+        return summary_to_odds(*get_all_book_odds(sport=sport))
+    games = fetch_scoreboard_games(sport=sport)
     dict_res = {}
     for game in games:
         home_team = game['home_team']
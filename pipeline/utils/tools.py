@@ -1,8 +1,13 @@
 import re
-from datetime import datetime
+import json
+from datetime import datetime, date as date_type
 import pandas as pd
 import requests
-from .team_code_index import team_index_current
+from sbrscrape import Scoreboard
+from .franchises import is_known_team
+from .response_cache import get_cache
+from . import metrics
+from .replay import get_replay_url, replay_url, record_response, ReplayScoreboard
 
 custom_user_agent = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6_1) AppleWebKit/537.36 (KHTML, like Gecko)'
                      ' Chrome/134.0.6998.118 Safari/537.36')
@@ -25,17 +30,63 @@ data_request_headers = {
     'Connection': 'keep-alive'
 }
 
-def fetch_json_data(url):
-    raw_data = requests.get(url, headers=data_request_headers)
+def fetch_json_data(url, as_of=None):
+    cache = get_cache()
+    payload = cache.get(url) if cache is not None else None
+    from_cache = payload is not None
+    if not from_cache:
+        with metrics.timer('http_request_seconds', client='fetch_json_data'):
+            response = requests.get(replay_url(url), headers=data_request_headers)
+        payload = response.content
+        if response.ok:
+            record_response(url, payload)
+    metrics.inc('http_requests_total', client='fetch_json_data', source='cache' if from_cache else 'network')
     try:
-        json_data = raw_data.json()
+        json_data = json.loads(payload)
     except Exception as e:
         print(f"Error fetching JSON: {e}")
         return {}
-    return json_data.get('resultSets')
+    result_sets = json_data.get('resultSets')
+    # Replayed responses (and injected faults) are never stored under the live URL
+    if cache is not None and not from_cache and get_replay_url() is None:
+        # Empty results may be a transient failure, so only keep them for the short TTL
+        cache.put(url, payload, as_of=as_of if result_sets and result_sets[0].get('rowSet') else None)
+    return result_sets
+
+
+def fetch_scoreboard_games(date=None, sport='NBA', limiter=None):
+    """Return sbrscrape Scoreboard games for a date (today when None), using the response cache
+
+    `limiter` is an optional rate limiter (anything with `acquire()`) consulted before a live scrape only.
+    """
+    cache = get_cache()
+    key = f"scoreboard:{sport}:{date or date_type.today()}"
+    payload = cache.get(key) if cache is not None else None
+    if payload is not None:
+        return json.loads(payload)
+
+    if limiter is not None:
+        limiter.acquire()
+    games = scrape_scoreboard(sport=sport, date=date)
+    if games:
+        record_response(key, json.dumps(games, default=str).encode())
+    if cache is not None and get_replay_url() is None:
+        cache.put(key, json.dumps(games, default=str).encode(), as_of=date if games else None)
+    return games
+
+def scrape_scoreboard(sport='NBA', date=None):
+    """One uncached sbrscrape Scoreboard scrape, served by the replay server in replay mode"""
+    base_url = get_replay_url()
+    if base_url is not None:
+        sb = ReplayScoreboard(base_url, sport=sport, date=date)
+    else:
+        sb = Scoreboard(sport=sport, date=date) if date else Scoreboard(sport=sport)
+    return sb.games if hasattr(sb, 'games') else []
 
 def fetch_today_games_json(url):
-    raw_data = requests.get(url, headers=games_request_headers)
+    raw_data = requests.get(replay_url(url), headers=games_request_headers)
+    if raw_data.ok:
+        record_response(url, raw_data.content)
     json_data = raw_data.json()
     return json_data.get('gs', {}).get('g', [])
 
@@ -61,7 +112,7 @@ def create_games_from_odds(odds_data):
     games = []
     for game in odds_data.keys():
         home_team, away_team = game.split(":")
-        if home_team not in team_index_current or away_team not in team_index_current:
+        if not is_known_team(home_team) or not is_known_team(away_team):
             continue
         games.append([home_team, away_team])
     return games
@@ -0,0 +1,49 @@
+from datetime import date as date_type, datetime, timedelta
+
+WATERMARK_TABLE = 'collection_log'
+
+
+def ensure_watermark_table(conn):
+    """Create the (source, date) completion log if it does not exist"""
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{WATERMARK_TABLE}" ('
+                 'source TEXT NOT NULL, date TEXT NOT NULL, final INTEGER NOT NULL, '
+                 'collected_at TEXT NOT NULL, PRIMARY KEY (source, date))')
+
+
+def is_final(date, mutable_days=1, today=None):
+    """Data for a date is final once it is more than `mutable_days` days in the past"""
+    if isinstance(date, datetime):
+        date = date.date()
+    elif not isinstance(date, date_type):
+        date = date_type.fromisoformat(str(date)[:10])
+    today = today or date_type.today()
+    return date < today - timedelta(days=mutable_days)
+
+
+def final_dates(conn, source):
+    """Return the set of dates already collected in their final state for a source"""
+    ensure_watermark_table(conn)
+    rows = conn.execute(f'SELECT date FROM "{WATERMARK_TABLE}" WHERE source = ? AND final = 1', (source,))
+    return {row[0] for row in rows}
+
+
+def mark_collected(conn, source, date, mutable_days=1):
+    """Record that a date was collected; the caller commits together with the data"""
+    ensure_watermark_table(conn)
+    conn.execute(f'INSERT OR REPLACE INTO "{WATERMARK_TABLE}" VALUES (?, ?, ?, datetime(\'now\'))',
+                 (source, str(date), int(is_final(date, mutable_days))))
+
+
+def seed_watermarks(conn, source, dates, mutable_days=1):
+    """Mark dates already present in the database as collected, without overriding existing entries"""
+    ensure_watermark_table(conn)
+    conn.executemany(f'INSERT OR IGNORE INTO "{WATERMARK_TABLE}" VALUES (?, ?, ?, datetime(\'now\'))',
+                     [(source, str(date), int(is_final(date, mutable_days))) for date in dates])
+    conn.commit()
+
+
+def clear_watermarks(conn, source):
+    """Forget every collected date for a source so it is fetched again"""
+    ensure_watermark_table(conn)
+    conn.execute(f'DELETE FROM "{WATERMARK_TABLE}" WHERE source = ?', (source,))
+    conn.commit()